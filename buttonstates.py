@@ -0,0 +1,130 @@
+import time
+
+# Shades within the same bucket (low BUCKET_BITS of each channel dropped) share
+# one learned state, so antialiasing and lighting drift stop adding entries.
+BUCKET_BITS = 2
+MAX_STATES = 24
+
+def pack_rgb(color):
+    r, g, b = color
+    return (int(r) << 16) | (int(g) << 8) | int(b)
+
+def parse_color_key(key):
+    # Settings store colors as str((r, g, b)).
+    try:
+        r, g, b = (int(v) for v in key.strip("()[] ").split(","))
+    except (AttributeError, ValueError):
+        return None
+    return r, g, b
+
+
+class ButtonStates:
+    """
+    Learned ON/OFF states of one button, keyed by quantized packed RGB.
+    Each bucket keeps the last exact shade seen, a hit count and a last-seen
+    time. Past max_states the least used, then least recently seen, bucket is
+    evicted, but never the last example of a state.
+    """
+
+    def __init__(self, states=None, max_states=MAX_STATES, bucket_bits=BUCKET_BITS):
+        self.max_states = max(2, int(max_states))
+        self.mask = (0xFF >> bucket_bits << bucket_bits) * 0x010101
+        # The saved {str((r, g, b)): state} table is only parsed when first used,
+        # so loading settings does not walk every learned shade of every button.
+        self.saved = dict(states or {})
+        self._entries = None
+        # Bumped whenever the learned shades or their states change.
+        self.version = 0
+
+    @property
+    def entries(self):
+        # bucket -> [state, color, hits, last_seen]
+        if self._entries is None:
+            self._entries = self.parse(self.saved)
+            self.saved = None
+            while len(self._entries) > self.max_states and self.evict():
+                pass
+        return self._entries
+
+    def parse(self, states):
+        entries = {}
+        votes = {}
+        for order, (key, state) in enumerate(states.items()):
+            color = parse_color_key(key)
+            if color is None:
+                continue
+            bucket = self.bucket(color)
+            votes.setdefault(bucket, {}).setdefault(state, 0)
+            votes[bucket][state] += 1
+            # Loaded shades were never seen this session; file order stands in for recency.
+            entries[bucket] = [state, color, 0, float(order - len(states))]
+        for bucket, counts in votes.items():
+            # Old files may hold several exact shades per bucket; keep the majority.
+            if len(counts) > 1:
+                entries[bucket][0] = max(counts, key=counts.get)
+        return entries
+
+    def bucket(self, color):
+        return pack_rgb(color) & self.mask
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, color):
+        return self.bucket(color) in self.entries
+
+    def get(self, color, default='unknown'):
+        entry = self.entries.get(self.bucket(color))
+        return entry[0] if entry is not None else default
+
+    def touch(self, color, now=None):
+        entry = self.entries.get(self.bucket(color))
+        if entry is not None:
+            entry[1] = tuple(color)
+            entry[2] += 1
+            entry[3] = time.monotonic() if now is None else now
+
+    def learn(self, color, state, now=None):
+        # Returns True when this adds a bucket or changes its state.
+        bucket = self.bucket(color)
+        entry = self.entries.get(bucket)
+        changed = entry is None or entry[0] != state
+        if entry is None:
+            self.entries[bucket] = [state, tuple(color), 0, 0.0]
+        else:
+            entry[0] = state
+        if changed:
+            self.version += 1
+        self.touch(color, now)
+        if len(self.entries) > self.max_states:
+            self.evict(keep=bucket)
+        return changed
+
+    def evict(self, keep=None):
+        state_counts = {}
+        for state, _, _, _ in self.entries.values():
+            state_counts[state] = state_counts.get(state, 0) + 1
+        candidates = [
+            (entry[2], entry[3], bucket)
+            for bucket, entry in self.entries.items()
+            if bucket != keep and state_counts[entry[0]] > 1
+        ]
+        if not candidates:
+            return False
+        del self.entries[min(candidates)[2]]
+        self.version += 1
+        return True
+
+    def to_json(self):
+        if self._entries is None:
+            return dict(self.saved)
+        return {str(color): state for state, color, _, _ in self.entries.values()}
+
+    def __deepcopy__(self, memo):
+        copied = ButtonStates.__new__(ButtonStates)
+        copied.max_states = self.max_states
+        copied.mask = self.mask
+        copied.saved = dict(self.saved) if self.saved is not None else None
+        copied._entries = None if self._entries is None else {b: list(entry) for b, entry in self._entries.items()}
+        copied.version = self.version
+        return copied
@@ -0,0 +1,860 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+import mss
+import numpy as np
+
+LOG_FN = None
+CAPTURE_METHOD_LOGGED = set()
+DEFAULT_COLOR = (128, 128, 128)
+SAMPLE_RADIUS = 4
+# Upper bound for a merged batch region; farther-apart buttons get their own grab.
+BATCH_MAX_PIXELS = 1_000_000
+# Recently analyzed ROIs, keyed by digest, so an unchanged button skips the histogram.
+ROI_MEMO_SIZE = 256
+
+def set_log_fn(fn):
+    global LOG_FN
+    LOG_FN = fn
+
+def log_capture_issue(message, key=None):
+    # Capture problems repeat every tick; the log shows each key once per interval.
+    if callable(LOG_FN):
+        LOG_FN(message, key=message if key is None else key)
+    else:
+        print(message)
+
+def log_capture_method_once(method):
+    if method in CAPTURE_METHOD_LOGGED:
+        return
+    CAPTURE_METHOD_LOGGED.add(method)
+    log_capture_issue(f"Capture method: {method}")
+
+# One captured button: majority color, per-pixel colors, monotonic capture
+# time and a digest of the ROI pixels (equal digests mean an unchanged button).
+ButtonSample = namedtuple("ButtonSample", "button color colors captured_at digest")
+# Every learned button captured in one tick; samples is a read-only mapping.
+CaptureSnapshot = namedtuple("CaptureSnapshot", "captured_at samples")
+# A grabbed screen region: BGRA bytes (or any buffer), size and bytes per row.
+Frame = namedtuple("Frame", "raw width height stride")
+
+def unpack_rgb(value):
+    return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+
+class RoiColors:
+    """
+    Per-pixel colors of one sampled ROI, in scan order.
+    Behaves like the list of (r, g, b) tuples the capture functions used to
+    return, but only builds that list when someone iterates it. Histogram
+    and mean are computed vectorized from the packed 0xRRGGBB values.
+    """
+
+    __slots__ = ("packed", "digest", "_tuples", "_histogram")
+
+    def __init__(self, packed, digest=None):
+        self.packed = packed
+        self.digest = digest
+        self._tuples = None
+        self._histogram = None
+
+    def __len__(self):
+        return int(self.packed.size)
+
+    def __bool__(self):
+        return self.packed.size > 0
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        return self.tolist()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, RoiColors):
+            return np.array_equal(self.packed, other.packed)
+        return self.tolist() == list(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def tolist(self):
+        if self._tuples is None:
+            self._tuples = [unpack_rgb(v) for v in self.packed.tolist()]
+        return self._tuples
+
+    def histogram(self):
+        # Distinct colors with their counts, ordered like Counter.most_common():
+        # highest count first, ties broken by first appearance in the ROI.
+        if self._histogram is None:
+            values, first, counts = np.unique(self.packed, return_index=True, return_counts=True)
+            order = np.lexsort((first, -counts))
+            self._histogram = (values[order], counts[order])
+        return self._histogram
+
+    def most_common(self, limit=None):
+        values, counts = self.histogram()
+        if limit is not None:
+            values, counts = values[:limit], counts[:limit]
+        return [(unpack_rgb(v), c) for v, c in zip(values.tolist(), counts.tolist())]
+
+    def mode(self):
+        values, _counts = self.histogram()
+        return unpack_rgb(int(values[0]))
+
+    def mean(self):
+        packed = self.packed
+        return (
+            float(((packed >> 16) & 0xFF).mean()),
+            float(((packed >> 8) & 0xFF).mean()),
+            float((packed & 0xFF).mean()),
+        )
+
+def bgra_roi(raw, stride, left, top, width, height):
+    # Zero-copy uint32 view of a rectangle inside a BGRA buffer, packed as 0xRRGGBB.
+    pixels = np.frombuffer(raw, dtype="<u4", count=(len(raw) // stride) * stride // 4)
+    pixels = pixels.reshape(-1, stride // 4)[top:top + height, left:left + width]
+    return (pixels & 0xFFFFFF).ravel()
+
+_ROI_MEMO = OrderedDict()
+_ROI_MEMO_LOCK = threading.Lock()
+
+def roi_digest(packed):
+    return hashlib.blake2b(packed, digest_size=8).digest()
+
+def sample_digest(colors):
+    if not colors:
+        return None
+    digest = getattr(colors, "digest", None)
+    if digest is not None:
+        return digest
+    return hashlib.blake2b(repr(list(colors)).encode(), digest_size=8).digest()
+
+def analyze_roi(packed):
+    if packed.size == 0:
+        return DEFAULT_COLOR, []
+    digest = roi_digest(packed)
+    with _ROI_MEMO_LOCK:
+        cached = _ROI_MEMO.get(digest)
+        if cached is not None:
+            _ROI_MEMO.move_to_end(digest)
+            return cached
+    colors = RoiColors(packed, digest)
+    result = (colors.mode(), colors)
+    with _ROI_MEMO_LOCK:
+        _ROI_MEMO[digest] = result
+        if len(_ROI_MEMO) > ROI_MEMO_SIZE:
+            _ROI_MEMO.popitem(last=False)
+    return result
+
+def sample_rect(x, y, monitor):
+    left = max(monitor["left"], x - SAMPLE_RADIUS)
+    top = max(monitor["top"], y - SAMPLE_RADIUS)
+    right = min(monitor["left"] + monitor["width"], x + SAMPLE_RADIUS + 1)
+    bottom = min(monitor["top"] + monitor["height"], y + SAMPLE_RADIUS + 1)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+def merge_rects(rects, max_pixels=BATCH_MAX_PIXELS):
+    # Greedily fold sample rectangles into as few grab regions as possible,
+    # keeping each merged region under max_pixels.
+    regions = []
+    for rect in sorted(rects, key=lambda r: (r[1], r[0])):
+        for index, (left, top, right, bottom) in enumerate(regions):
+            merged = (min(left, rect[0]), min(top, rect[1]), max(right, rect[2]), max(bottom, rect[3]))
+            if (merged[2] - merged[0]) * (merged[3] - merged[1]) <= max_pixels:
+                regions[index] = merged
+                break
+        else:
+            regions.append(rect)
+    return regions
+
+
+class CaptureBackend:
+    """
+    A source of screen pixels. Backends report the monitor layout as
+    (left, top, right, bottom, monitor) tuples with the virtual screen first,
+    and grab a region as a BGRA Frame. sample_points() batches learned
+    points over grab(); backends that cannot serve a point may leave it out
+    of the result so the next backend in the chain gets a try.
+    """
+
+    name = "capture"
+
+    def monitor_bounds(self):
+        raise NotImplementedError
+
+    def monitors(self):
+        return [monitor for *_edges, monitor in self.monitor_bounds()]
+
+    def monitor_for_point(self, x, y):
+        # Returns the physical monitor containing the point, the virtual screen
+        # if it falls between monitors, or None when it is off-screen entirely.
+        bounds = self.monitor_bounds()
+        v_left, v_top, v_right, v_bottom, virtual = bounds[0]
+        if not (v_left <= x < v_right and v_top <= y < v_bottom):
+            return None
+        for m_left, m_top, m_right, m_bottom, monitor in bounds[1:]:
+            if m_left <= x < m_right and m_top <= y < m_bottom:
+                return monitor
+        return virtual
+
+    def grab(self, left, top, width, height):
+        raise NotImplementedError
+
+    def sample_points(self, points):
+        """
+        Sample the majority color around several points with as few grabs as possible.
+        `points` maps a key to (x, y); returns key -> (most_common, colors).
+        Points are grouped per monitor, merged into bounding regions, grabbed
+        once per region and sliced back out of the shared buffer.
+        """
+        results = {}
+        by_monitor = {}
+        for key, (x, y) in points.items():
+            x, y = int(x), int(y)
+            monitor = self.monitor_for_point(x, y)
+            rect = sample_rect(x, y, monitor) if monitor is not None else None
+            if rect is None:
+                results[key] = (DEFAULT_COLOR, [])
+                continue
+            by_monitor.setdefault(id(monitor), []).append((key, rect))
+
+        for entries in by_monitor.values():
+            for region in merge_rects([rect for _, rect in entries]):
+                r_left, r_top, r_right, r_bottom = region
+                frame = self.grab(r_left, r_top, r_right - r_left, r_bottom - r_top)
+                for key, (left, top, right, bottom) in entries:
+                    if key in results:
+                        continue
+                    if left < r_left or top < r_top or right > r_right or bottom > r_bottom:
+                        continue
+                    packed = bgra_roi(frame.raw, frame.stride, left - r_left, top - r_top, right - left, bottom - top)
+                    results[key] = analyze_roi(packed)
+        return results
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MssBackend(CaptureBackend):
+    """
+    Cross-platform capture through mss, kept alive between reads.
+    Owns the mss handle (one per thread, as mss requires) and a cached
+    monitor layout. Both are rebuilt lazily after invalidate(), which the
+    GUI calls whenever the screen configuration changes.
+    """
+
+    name = "mss virtual screen"
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._monitor_bounds = None
+
+    def _sct(self):
+        local = self._local
+        sct = getattr(local, "sct", None)
+        if sct is not None and local.generation == self._generation:
+            return sct
+        if sct is not None:
+            try:
+                sct.close()
+            except Exception:
+                pass
+        local.sct = mss.mss()
+        local.generation = self._generation
+        return local.sct
+
+    def monitor_bounds(self):
+        # [(left, top, right, bottom, monitor), ...] with the virtual screen first.
+        bounds = self._monitor_bounds
+        if bounds is None:
+            bounds = [
+                (m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"], dict(m))
+                for m in self._sct().monitors
+            ]
+            self._monitor_bounds = bounds
+        return bounds
+
+    def grab(self, left, top, width, height):
+        img = self._sct().grab({"left": left, "top": top, "width": width, "height": height})
+        return Frame(img.raw, img.width, img.height, img.width * 4)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._monitor_bounds = None
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            self._local.sct = None
+            try:
+                sct.close()
+            except Exception:
+                pass
+
+
+class QuartzBackend(CaptureBackend):
+    """
+    macOS window-image capture with cached window lookups.
+    Each learned point is resolved to the window under it once; the mapping
+    is kept until that window moves, resizes or closes. Every tick captures
+    each window once, limited to the bounding rectangle of its points, and
+    serves all of them from that buffer without copying it again.
+    """
+
+    name = "macOS window image"
+    # Points outside every window are re-probed at most this often (seconds).
+    MISS_RETRY = 5.0
+
+    def __init__(self):
+        self.point_windows = {}  # (x, y) -> window id
+        self.window_bounds = {}  # window id -> (x, y, width, height)
+        self.missed_points = {}  # (x, y) -> monotonic time of the next lookup
+        self.lock = threading.Lock()
+
+    def monitor_bounds(self):
+        from Quartz import CGGetActiveDisplayList, CGDisplayBounds
+
+        _err, display_ids, _count = CGGetActiveDisplayList(16, None, None)
+        monitors = []
+        for display_id in display_ids or []:
+            rect = CGDisplayBounds(display_id)
+            monitors.append({
+                "left": int(rect.origin.x),
+                "top": int(rect.origin.y),
+                "width": int(rect.size.width),
+                "height": int(rect.size.height),
+            })
+        if not monitors:
+            return [(0, 0, 0, 0, {"left": 0, "top": 0, "width": 0, "height": 0})]
+        left = min(m["left"] for m in monitors)
+        top = min(m["top"] for m in monitors)
+        right = max(m["left"] + m["width"] for m in monitors)
+        bottom = max(m["top"] + m["height"] for m in monitors)
+        virtual = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        return [(left, top, right, bottom, virtual)] + [
+            (m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"], m) for m in monitors
+        ]
+
+    def grab(self, left, top, width, height):
+        # Composited screen region at nominal (point) resolution, like mss returns it.
+        from Quartz import CGWindowListCreateImage, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+        from Quartz import kCGWindowImageNominalResolution
+        from Quartz import CGImageGetDataProvider, CGDataProviderCopyData, CGImageGetBytesPerRow
+        from Quartz import CGImageGetWidth, CGImageGetHeight
+        from Quartz import CoreGraphics as CG
+
+        image = CGWindowListCreateImage(
+            CG.CGRectMake(left, top, width, height),
+            kCGWindowListOptionOnScreenOnly,
+            kCGNullWindowID,
+            kCGWindowImageNominalResolution,
+        )
+        if not image:
+            raise RuntimeError("could not create image")
+        data = CGDataProviderCopyData(CGImageGetDataProvider(image))
+        return Frame(memoryview(data), CGImageGetWidth(image), CGImageGetHeight(image), CGImageGetBytesPerRow(image))
+
+    @staticmethod
+    def info_bounds(info):
+        bounds = info.get("kCGWindowBounds")
+        if not bounds:
+            return None
+        bx = bounds.get("X")
+        by = bounds.get("Y")
+        bw = bounds.get("Width")
+        bh = bounds.get("Height")
+        if bx is None or by is None or bw is None or bh is None:
+            return None
+        return bx, by, bw, bh
+
+    def forget_window(self, window_id):
+        self.window_bounds.pop(window_id, None)
+        self.missed_points.clear()
+        for point, wid in list(self.point_windows.items()):
+            if wid == window_id:
+                del self.point_windows[point]
+
+    def validate_windows(self):
+        # One single-window query per cached window instead of walking every window on screen.
+        from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionIncludingWindow
+
+        for window_id, cached in list(self.window_bounds.items()):
+            info_list = CGWindowListCopyWindowInfo(kCGWindowListOptionIncludingWindow, window_id) or []
+            info = info_list[0] if info_list else None
+            if info is None or not info.get("kCGWindowIsOnscreen", True) or self.info_bounds(info) != cached:
+                self.forget_window(window_id)
+
+    def resolve_points(self, points):
+        from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+
+        now = time.monotonic()
+        unresolved = [
+            point for point in points
+            if point not in self.point_windows and self.missed_points.get(point, 0) <= now
+        ]
+        if not unresolved:
+            return
+        window_list = CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or []
+        windows = []
+        for info in window_list:
+            bounds = self.info_bounds(info)
+            if bounds is not None:
+                windows.append((info.get("kCGWindowNumber"), bounds))
+        for x, y in unresolved:
+            # Window list is front to back; the first hit is the window the user sees.
+            for window_id, (bx, by, bw, bh) in windows:
+                if bx <= x < bx + bw and by <= y < by + bh:
+                    self.point_windows[(x, y)] = window_id
+                    self.window_bounds[window_id] = (bx, by, bw, bh)
+                    self.missed_points.pop((x, y), None)
+                    break
+            else:
+                self.missed_points[(x, y)] = now + self.MISS_RETRY
+
+    def capture_window(self, window_id, rect):
+        from Quartz import CGWindowListCreateImage, kCGWindowListOptionIncludingWindow
+        from Quartz import kCGWindowImageBoundsIgnoreFraming, kCGWindowImageBestResolution
+        from Quartz import CGImageGetDataProvider, CGDataProviderCopyData, CGImageGetBytesPerRow
+        from Quartz import CGImageGetWidth, CGImageGetHeight
+        from Quartz import CoreGraphics as CG
+
+        left, top, right, bottom = rect
+        image = CGWindowListCreateImage(
+            CG.CGRectMake(left, top, right - left, bottom - top),
+            kCGWindowListOptionIncludingWindow,
+            window_id,
+            kCGWindowImageBoundsIgnoreFraming | kCGWindowImageBestResolution,
+        )
+        if not image:
+            return None
+        data = CGDataProviderCopyData(CGImageGetDataProvider(image))
+        try:
+            buf = memoryview(data)
+        except TypeError:
+            buf = bytes(data)
+        return buf, CGImageGetBytesPerRow(image), CGImageGetWidth(image), CGImageGetHeight(image)
+
+    def sample_points(self, points):
+        """
+        Same contract as CaptureSession.sample_points, but only for points that
+        lie inside an on-screen window; the rest are left out of the result.
+        """
+        with self.lock:
+            return self.sample_windows(points)
+
+    def sample_windows(self, points):
+        self.validate_windows()
+        self.resolve_points(set(points.values()))
+        by_window = {}
+        for key, point in points.items():
+            window_id = self.point_windows.get(point)
+            if window_id is not None:
+                by_window.setdefault(window_id, []).append((key, point))
+        if len(by_window) < len(set(points.values())):
+            log_capture_method_once("macOS window image (no window found)")
+
+        results = {}
+        for window_id, entries in by_window.items():
+            bx, by, bw, bh = self.window_bounds[window_id]
+            window = {"left": int(bx), "top": int(by), "width": int(bw), "height": int(bh)}
+            rects = {key: sample_rect(x, y, window) for key, (x, y) in entries}
+            rects = {key: rect for key, rect in rects.items() if rect is not None}
+            if not rects:
+                continue
+            region = (
+                min(r[0] for r in rects.values()),
+                min(r[1] for r in rects.values()),
+                max(r[2] for r in rects.values()),
+                max(r[3] for r in rects.values()),
+            )
+            captured = self.capture_window(window_id, region)
+            if captured is None:
+                continue
+            buf, bytes_per_row, img_width, img_height = captured
+            # Retina windows come back at backing-store resolution.
+            scale = img_width / max(1, region[2] - region[0])
+            for key, (x, y) in entries:
+                if key not in rects:
+                    continue
+                local_x = int((x - region[0]) * scale)
+                local_y = int((y - region[1]) * scale)
+                if not (0 <= local_x < img_width and 0 <= local_y < img_height):
+                    log_capture_issue("Capture method: macOS window image (point outside window image)")
+                    continue
+                left = max(0, local_x - SAMPLE_RADIUS)
+                top = max(0, local_y - SAMPLE_RADIUS)
+                right = min(img_width, local_x + SAMPLE_RADIUS + 1)
+                bottom = min(img_height, local_y + SAMPLE_RADIUS + 1)
+                results[key] = analyze_roi(bgra_roi(buf, bytes_per_row, left, top, right - left, bottom - top))
+        return results
+
+    def invalidate(self):
+        with self.lock:
+            self.point_windows.clear()
+            self.window_bounds.clear()
+            self.missed_points.clear()
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """
+    Last-resort capture through pyautogui.screenshot(). Slow, but it works
+    in setups where neither mss nor Quartz can grab the screen. Each merged
+    sample region is fetched with a single screenshot call.
+    """
+
+    name = "pyautogui screenshot"
+
+    def monitor_bounds(self):
+        import pyautogui
+
+        width, height = pyautogui.size()
+        screen = {"left": 0, "top": 0, "width": width, "height": height}
+        return [(0, 0, width, height, screen), (0, 0, width, height, screen)]
+
+    def grab(self, left, top, width, height):
+        import pyautogui
+
+        image = pyautogui.screenshot(region=(left, top, width, height)).convert("RGB")
+        rgb = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(-1, 3).astype("<u4")
+        bgra = 0xFF000000 | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        return Frame(bgra.tobytes(), image.width, image.height, image.width * 4)
+
+    def sample_points(self, points):
+        # Points off the primary screen may still be readable here, so do not clip to monitors.
+        rects = {
+            key: (x - SAMPLE_RADIUS, y - SAMPLE_RADIUS, x + SAMPLE_RADIUS + 1, y + SAMPLE_RADIUS + 1)
+            for key, (x, y) in points.items()
+        }
+        results = {}
+        for region in merge_rects(list(rects.values())):
+            r_left, r_top, r_right, r_bottom = region
+            frame = self.grab(r_left, r_top, r_right - r_left, r_bottom - r_top)
+            for key, (left, top, right, bottom) in rects.items():
+                if key in results or left < r_left or top < r_top or right > r_right or bottom > r_bottom:
+                    continue
+                packed = bgra_roi(frame.raw, frame.stride, left - r_left, top - r_top, right - left, bottom - top)
+                results[key] = analyze_roi(packed)
+        return results
+
+
+class SyntheticBackend(CaptureBackend):
+    """
+    In-memory BGRA framebuffer standing in for the screen. Tests, benchmarks
+    and soak runs paint button states into it with fill() / paint_button(),
+    so the detection and automation loop can run without any display.
+    """
+
+    name = "synthetic framebuffer"
+
+    def __init__(self, width=1920, height=1080, monitors=None, background=(0, 0, 0)):
+        if monitors is None:
+            monitors = [{"left": 0, "top": 0, "width": width, "height": height}]
+        left = min(m["left"] for m in monitors)
+        top = min(m["top"] for m in monitors)
+        right = max(m["left"] + m["width"] for m in monitors)
+        bottom = max(m["top"] + m["height"] for m in monitors)
+        virtual = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        self.bounds = [(left, top, right, bottom, virtual)] + [
+            (m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"], dict(m)) for m in monitors
+        ]
+        self.origin = (left, top)
+        self.lock = threading.Lock()
+        self.pixels = np.full((bottom - top, right - left), self.pack(background), dtype="<u4")
+        self.grab_count = 0
+
+    @staticmethod
+    def pack(color):
+        r, g, b = color[:3]
+        return 0xFF000000 | (r << 16) | (g << 8) | b
+
+    def fill(self, left, top, width, height, color):
+        x0 = max(0, left - self.origin[0])
+        y0 = max(0, top - self.origin[1])
+        x1 = max(0, left + width - self.origin[0])
+        y1 = max(0, top + height - self.origin[1])
+        with self.lock:
+            self.pixels[y0:y1, x0:x1] = self.pack(color)
+
+    def paint_button(self, x, y, color, radius=SAMPLE_RADIUS + 2):
+        self.fill(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1, color)
+
+    def monitor_bounds(self):
+        return self.bounds
+
+    def grab(self, left, top, width, height):
+        x0 = left - self.origin[0]
+        y0 = top - self.origin[1]
+        with self.lock:
+            self.grab_count += 1
+            raw = self.pixels[y0:y0 + height, x0:x0 + width].tobytes()
+        return Frame(raw, width, height, width * 4)
+
+
+class CircuitBreaker:
+    """
+    Remembers a failing backend. After a failure the backend is skipped
+    until its backoff expires, then probed once; every further failure
+    doubles the backoff up to max_delay.
+    """
+
+    def __init__(self, base_delay=2.0, max_delay=300.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.open_until = 0.0
+
+    def allow(self, now):
+        return now >= self.open_until
+
+    def record_success(self):
+        recovered = self.failures > 0
+        self.failures = 0
+        self.open_until = 0.0
+        return recovered
+
+    def record_failure(self, now):
+        self.failures += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        self.open_until = now + delay
+        return delay
+
+
+class BackendChain:
+    """
+    Ordered capture backends. Each one serves what it can; points it leaves
+    out, or all of them if it raises, fall through to the next backend.
+    A per-backend circuit breaker keeps a failing backend out of the hot
+    path until it is due for another probe.
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.breakers = [CircuitBreaker() for _ in self.backends]
+        self.lock = threading.Lock()
+
+    def sample_points(self, points):
+        results = {}
+        remaining = dict(points)
+        failed = None
+        for backend, breaker in zip(self.backends, self.breakers):
+            if not remaining:
+                break
+            with self.lock:
+                allowed = breaker.allow(time.monotonic())
+            if not allowed:
+                failed = failed or backend
+                continue
+            try:
+                served = backend.sample_points(remaining)
+            except Exception as e:
+                with self.lock:
+                    delay = breaker.record_failure(time.monotonic())
+                report_capture_failure(backend, e)
+                log_capture_issue(f"Capture backend {backend.name} disabled; retrying in {delay:.0f}s",
+                                  key=("backend disabled", backend.name))
+                failed = failed or backend
+                continue
+            with self.lock:
+                recovered = breaker.record_success()
+            if recovered:
+                log_capture_issue(f"Capture backend {backend.name} recovered")
+            if served:
+                if failed is not None:
+                    log_capture_method_once(f"{backend.name} (fallback from {failed.name})")
+                else:
+                    log_capture_method_once(backend.name)
+            results.update(served)
+            remaining = {key: point for key, point in remaining.items() if key not in served}
+        for key in remaining:
+            results[key] = (DEFAULT_COLOR, [])
+        return results
+
+    def grab(self, left, top, width, height):
+        """
+        Grab a screen region from the first backend that can, clipped to the
+        virtual screen. Returns (frame, left, top) of what was actually
+        grabbed, or None when the region is off-screen or every backend fails.
+        """
+        for backend, breaker in zip(self.backends, self.breakers):
+            with self.lock:
+                allowed = breaker.allow(time.monotonic())
+            if not allowed:
+                continue
+            try:
+                v_left, v_top, v_right, v_bottom, _virtual = backend.monitor_bounds()[0]
+                g_left, g_top = max(left, v_left), max(top, v_top)
+                g_right, g_bottom = min(left + width, v_right), min(top + height, v_bottom)
+                if g_right <= g_left or g_bottom <= g_top:
+                    return None
+                return backend.grab(g_left, g_top, g_right - g_left, g_bottom - g_top), g_left, g_top
+            except Exception:
+                # sample_points() owns failure reporting and the breakers; just try the next one.
+                continue
+        return None
+
+    def invalidate(self):
+        for backend in self.backends:
+            backend.invalidate()
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+
+
+def default_backends():
+    backends = []
+    if sys.platform == "darwin":
+        backends.append(QuartzBackend())
+    backends.append(MssBackend())
+    backends.append(PyAutoGuiBackend())
+    return backends
+
+_BACKENDS = BackendChain(default_backends())
+
+def capture_backends():
+    return _BACKENDS
+
+def set_capture_backends(backends):
+    # Swap the capture source, e.g. for a SyntheticBackend in tests or benchmarks.
+    global _BACKENDS
+    _BACKENDS = BackendChain(backends)
+    frame_cache().clear()
+    return _BACKENDS
+
+def report_capture_failure(backend, e):
+    # A failed grab may mean the display went away; reconnect on the next read.
+    backend.invalidate()
+    msg = str(e)
+    if "could not create image" in msg.lower() or "display" in msg.lower():
+        log_capture_issue("Screen capture failed. On macOS, grant Screen Recording permission to the Python app (System Settings → Privacy & Security → Screen Recording).")
+    else:
+        log_capture_issue(f"Screen capture failed: {e}")
+
+def get_pixel_color(x, y):
+    # Cross-platform pixel color detection w multi-monitor support
+    return get_button_colors({(x, y): (x, y)})[(x, y)]
+
+def get_button_colors(points):
+    """
+    Sample every learned button for one tick. `points` maps button -> (x, y).
+    Returns button -> (most_common, colors), using one batched grab where possible.
+    """
+    if not points:
+        return {}
+    points = {key: (int(x), int(y)) for key, (x, y) in points.items()}
+    return capture_backends().sample_points(points)
+
+class FrameCache:
+    """
+    Latest capture of every learned button, keyed by button and shared by
+    all readers. capture() only grabs buttons whose entry is older than the
+    TTL, so the same region is never captured twice in one tick; lookup()
+    serves automation reads without capturing. Hits (reads served from the
+    cache), misses and actual captures are counted so the saving can be
+    checked with stats().
+    """
+
+    def __init__(self, ttl=0.5):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> ButtonSample
+        self.points = {}   # key -> (x, y) the sample was taken at
+        self.hits = 0
+        self.misses = 0
+        self.captures = 0
+
+    def fresh_entry(self, key, point, now, max_age, not_before=0.0):
+        sample = self.entries.get(key)
+        if sample is None or self.points.get(key) != point:
+            return None
+        if now - sample.captured_at > max_age or sample.captured_at <= not_before:
+            return None
+        return sample
+
+    def capture(self, points):
+        points = {key: (int(x), int(y)) for key, (x, y) in points.items()}
+        now = time.monotonic()
+        samples = {}
+        with self.lock:
+            for key, point in points.items():
+                sample = self.fresh_entry(key, point, now, self.ttl)
+                if sample is not None:
+                    samples[key] = sample
+            self.hits += len(samples)
+            self.captures += len(points) - len(samples)
+        stale = {key: point for key, point in points.items() if key not in samples}
+        if stale:
+            captured_at = time.monotonic()
+            captured = {
+                key: ButtonSample(key, color, colors, captured_at, sample_digest(colors))
+                for key, (color, colors) in get_button_colors(stale).items()
+            }
+            with self.lock:
+                for key, sample in captured.items():
+                    self.entries[key] = sample
+                    self.points[key] = stale[key]
+            samples.update(captured)
+        return CaptureSnapshot(now, MappingProxyType(samples))
+
+    def store(self, samples, points):
+        # Install samples captured elsewhere (e.g. a replayed recording) as the latest entries.
+        with self.lock:
+            for key, sample in samples.items():
+                if key in points:
+                    self.entries[key] = sample
+                    self.points[key] = (int(points[key][0]), int(points[key][1]))
+
+    def lookup(self, key, point, max_age=None, not_before=0.0):
+        # Returns the cached sample, or None when it is missing, stale, taken at
+        # another position, or older than not_before (e.g. our own last click).
+        point = (int(point[0]), int(point[1]))
+        with self.lock:
+            sample = self.fresh_entry(key, point, time.monotonic(), self.ttl if max_age is None else max_age, not_before)
+            if sample is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return sample
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "captures": self.captures,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.captures = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.points.clear()
+
+
+_FRAME_CACHE = FrameCache()
+
+def frame_cache():
+    return _FRAME_CACHE
+
+def capture_snapshot(points):
+    return frame_cache().capture(points)
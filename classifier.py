@@ -0,0 +1,127 @@
+import sys
+import time
+
+import numpy as np
+
+from buttonstates import ButtonStates
+from colornames import get_color_name
+
+MIN_CONFIDENCE = 0.5
+# Pixels farther than this (RGB distance) from every learned shade abstain:
+# they belong to neither a known ON nor a known OFF fill.
+MAX_DISTANCE = 24
+INACTIVE_NAMES = ("white", "gray", "silver", "black")
+
+def palette_state(color):
+    # The original rule: the modal pixel's palette name decides ON/OFF.
+    if get_color_name(*color) in INACTIVE_NAMES:
+        return "inactive"
+    return "active"
+
+def color_histogram(colors):
+    # (values, counts) of the distinct packed colors in a ROI.
+    if hasattr(colors, "histogram"):
+        return colors.histogram()
+    packed = np.array([(r << 16) | (g << 8) | b for r, g, b in colors], dtype=np.uint32)
+    return np.unique(packed, return_counts=True)
+
+
+class StateClassifier:
+    """
+    Nearest-neighbor ON/OFF vote over a whole ROI histogram.
+    Every distinct color in the ROI votes, weighted by its pixel count, for
+    the state of the closest shade learned for the button. classify() returns
+    (state, confidence), confidence being the winning margin as a fraction of
+    all pixels, so edge shades and unknown pixels pull it down.
+    """
+
+    def __init__(self, states):
+        self.states = states
+        self.version = None
+
+    def refresh(self):
+        if self.version == self.states.version:
+            return
+        entries = list(self.states.entries.values())
+        self.labels = sorted({state for state, _, _, _ in entries})
+        self.examples = np.array([color for _, color, _, _ in entries], dtype=np.int32).reshape(-1, 3)
+        self.example_labels = np.array([self.labels.index(state) for state, _, _, _ in entries], dtype=np.intp)
+        self.version = self.states.version
+
+    def classify(self, colors):
+        self.refresh()
+        if len(self.labels) < 2 or not colors:
+            return None, 0.0
+        values, counts = color_histogram(colors)
+        values = values.astype(np.int32)
+        rgb = np.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=1)
+        diff = rgb[:, None, :] - self.examples[None, :, :]
+        distances = (diff * diff).sum(axis=2)
+        nearest = distances.argmin(axis=1)
+        near_enough = distances[np.arange(len(nearest)), nearest] <= MAX_DISTANCE * MAX_DISTANCE
+        votes = np.bincount(
+            self.example_labels[nearest[near_enough]],
+            weights=counts[near_enough],
+            minlength=len(self.labels),
+        )
+        order = np.argsort(votes)[::-1]
+        if votes[order[0]] <= 0:
+            return None, 0.0
+        confidence = float((votes[order[0]] - votes[order[1]]) / counts.sum())
+        return self.labels[order[0]], confidence
+
+
+def benchmark(recording_path, settings_path="settings.json"):
+    """
+    Replays a capture recording through both classifiers and prints accuracy
+    and per-call latency. Frames whose modal shade has a learned state in
+    settings are the labels; that shade is left out of the histogram
+    classifier's examples while its frame is scored.
+    """
+    import copy
+    import json
+    from recording import CaptureReplay
+
+    with open(settings_path) as f:
+        learned = json.load(f).get("learned_buttons", {})
+    tables = {button: ButtonStates(data.get("states")) for button, data in learned.items()}
+    results = {"palette": [0, 0, 0.0], "histogram": [0, 0, 0.0]}
+    held_out = {}
+    low_confidence = 0
+    get_color_name(0, 0, 0)  # build the lookup table outside the timed calls
+    for snapshot in CaptureReplay(recording_path):
+        for button, sample in snapshot.samples.items():
+            states = tables.get(button)
+            label = states.get(sample.color, None) if states is not None else None
+            if label is None:
+                continue
+            key = (button, states.bucket(sample.color))
+            classifier = held_out.get(key)
+            if classifier is None:
+                without = copy.deepcopy(states)
+                del without.entries[key[1]]
+                without.version += 1
+                classifier = held_out[key] = StateClassifier(without)
+            start = time.perf_counter()
+            predicted = palette_state(sample.color)
+            results["palette"][2] += time.perf_counter() - start
+            results["palette"][0] += predicted == label
+            results["palette"][1] += 1
+            start = time.perf_counter()
+            predicted, confidence = classifier.classify(sample.colors)
+            results["histogram"][2] += time.perf_counter() - start
+            if confidence < MIN_CONFIDENCE:
+                low_confidence += 1
+                continue
+            results["histogram"][0] += predicted == label
+            results["histogram"][1] += 1
+    for name, (correct, total, elapsed) in results.items():
+        if total:
+            print(f"{name}: {correct}/{total} correct ({correct / total:.1%}), {elapsed / total * 1e6:.1f} us/call")
+    print(f"histogram: {low_confidence} low-confidence reads re-sampled instead of classified")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python classifier.py RECORDING.ft8rec [settings.json]")
+        sys.exit(2)
+    benchmark(*sys.argv[1:3])
@@ -0,0 +1,108 @@
+from functools import lru_cache
+
+import numpy as np
+
+PALETTE = {
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "orange": (255, 165, 0),
+    "purple": (128, 0, 128),
+    "pink": (255, 192, 203),
+    "brown": (165, 42, 42),
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "gray": (128, 128, 128),
+    "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255),
+    "lime": (0, 255, 0),
+    "navy": (0, 0, 128),
+    "maroon": (128, 0, 0),
+    "olive": (128, 128, 0),
+    "teal": (0, 128, 128),
+    "silver": (192, 192, 192),
+    "gold": (255, 215, 0),
+    "crimson": (220, 20, 60),
+    "indigo": (75, 0, 130),
+    "violet": (238, 130, 238),
+    "salmon": (250, 128, 114),
+    "coral": (255, 127, 80),
+    "khaki": (240, 230, 140),
+    "tan": (210, 180, 140),
+    "lavender": (230, 230, 250),
+    "turquoise": (64, 224, 208),
+    "beige": (245, 245, 220),
+}
+NAMES = tuple(PALETTE)
+VALUES = np.array(list(PALETTE.values()), dtype=np.int64)
+
+# The RGB cube is split into 32x32x32 cells of 8x8x8 shades. Nearest-color
+# regions are convex, so a cell whose eight corners share a nearest palette
+# entry maps to it entirely; only cells straddling a boundary are resolved
+# per pixel. Results match the brute-force search exactly, ties included.
+CELL_BITS = 3
+CELLS = 256 >> CELL_BITS
+MIXED = 255
+_CELL_TABLE = None
+_CELL_BYTES = None
+
+def nearest_indices(rgb):
+    # rgb: (n, 3) ints. Squared distances expanded as |p|^2 - 2 p.v + |v|^2 in
+    # exact integers; argmin keeps the first minimum, like the linear scan.
+    rgb = np.asarray(rgb, dtype=np.int64)
+    distances = (VALUES * VALUES).sum(axis=1) - 2 * (rgb @ VALUES.T)
+    return np.argmin(distances, axis=1)
+
+def cell_table():
+    global _CELL_TABLE
+    if _CELL_TABLE is None:
+        low = np.arange(CELLS) << CELL_BITS
+        corners = np.stack([low, low + (1 << CELL_BITS) - 1], axis=1).ravel()
+        grid = np.stack(np.meshgrid(corners, corners, corners, indexing="ij"), axis=-1).reshape(-1, 3)
+        nearest = nearest_indices(grid).reshape(CELLS, 2, CELLS, 2, CELLS, 2)
+        nearest = nearest.transpose(0, 2, 4, 1, 3, 5).reshape(CELLS, CELLS, CELLS, 8)
+        table = np.where((nearest == nearest[..., :1]).all(axis=-1), nearest[..., 0], MIXED)
+        _CELL_TABLE = table.astype(np.uint8).ravel()
+    return _CELL_TABLE
+
+@lru_cache(maxsize=4096)
+def _mixed_cell_index(r, g, b):
+    min_distance = float("inf")
+    closest = None
+    for index, (cr, cg, cb) in enumerate(PALETTE.values()):
+        distance = (r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2
+        if distance < min_distance:
+            min_distance = distance
+            closest = index
+    return closest
+
+def get_color_name(r, g, b):
+    """
+    Convert RGB values (0-255) to color name.
+    Finds the closest matching color from 30 common colors.
+    """
+    global _CELL_BYTES
+    if _CELL_BYTES is None:
+        _CELL_BYTES = cell_table().tobytes()
+    r, g, b = int(r), int(g), int(b)
+    index = _CELL_BYTES[((r >> CELL_BITS) * CELLS + (g >> CELL_BITS)) * CELLS + (b >> CELL_BITS)]
+    if index == MIXED:
+        index = _mixed_cell_index(r, g, b)
+    return NAMES[index]
+
+def color_name_indices(packed):
+    """Palette index for every packed 0xRRGGBB pixel of a ROI, in one pass."""
+    packed = np.asarray(packed, dtype=np.uint32)
+    r = (packed >> 16) & 0xFF
+    g = (packed >> 8) & 0xFF
+    b = packed & 0xFF
+    cells = ((r >> CELL_BITS) * CELLS + (g >> CELL_BITS)) * CELLS + (b >> CELL_BITS)
+    indices = cell_table()[cells].astype(np.intp)
+    mixed = indices == MIXED
+    if mixed.any():
+        indices[mixed] = nearest_indices(np.stack([r[mixed], g[mixed], b[mixed]], axis=1))
+    return indices
+
+def color_names(packed):
+    return [NAMES[i] for i in color_name_indices(packed)]
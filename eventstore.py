@@ -0,0 +1,200 @@
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+EVENT_DB = "events.db"
+# Columns of their own; any other field of an event is kept as JSON in `detail`.
+COLUMNS = ("button", "band", "state", "color")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    session REAL NOT NULL,
+    mono REAL NOT NULL,
+    kind TEXT NOT NULL,
+    button TEXT,
+    band TEXT,
+    state TEXT,
+    color INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+CREATE INDEX IF NOT EXISTS events_kind_button_ts ON events (kind, button, ts, band);
+"""
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class EventStore:
+    """
+    Append-only SQLite (WAL) record of clicks, state transitions, band
+    changes, CQs and runaway stops. record() only queues the event; a
+    background thread inserts queued events in one transaction per batch.
+    Every row carries the wall time, the session's start and a monotonic
+    time, so events of one session order correctly even if the clock is
+    stepped. Queries use their own connection and never wait for writes.
+    A database that cannot be opened is reported through on_error and
+    leaves the store disabled: record() drops events and queries return [].
+    """
+
+    def __init__(self, path=EVENT_DB, batch_interval=0.5, on_error=None):
+        self.path = path
+        self.batch_interval = batch_interval
+        self.on_error = on_error
+        self.session = time.time()
+        self.queue = queue.Queue()
+        self.failed = False
+        self.read_lock = threading.Lock()
+        self.reader = None
+        self.thread = None
+        try:
+            self.reader = connect(path)
+        except sqlite3.Error as e:
+            self.disable(e)
+            return
+        self.thread = threading.Thread(target=self.run, name="event-store", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, created=None, **fields):
+        if not self.failed:
+            self.queue.put((time.time() if created is None else created, time.monotonic(), kind, fields))
+
+    def row(self, event):
+        created, mono, kind, fields = event
+        color = fields.get("color")
+        detail = {key: value for key, value in fields.items() if key not in COLUMNS}
+        return (
+            created, self.session, mono, kind,
+            fields.get("button"), fields.get("band"), fields.get("state"),
+            (int(color[0]) << 16) | (int(color[1]) << 8) | int(color[2]) if color else None,
+            json.dumps(detail, default=str) if detail else None,
+        )
+
+    def run(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error as e:
+            self.disable(e)
+            return
+        while True:
+            batch = [self.queue.get()]
+            # Whatever arrives within batch_interval shares the transaction.
+            deadline = time.monotonic() + self.batch_interval
+            while batch[-1] is not None and not isinstance(batch[-1], threading.Event):
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            events = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if events:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO events (ts, session, mono, kind, button, band, state, color, detail)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [self.row(event) for event in events],
+                        )
+            except sqlite3.Error as e:
+                self.fail(e)
+            if isinstance(batch[-1], threading.Event):
+                batch[-1].set()
+            elif batch[-1] is None:
+                connection.close()
+                return
+
+    def fail(self, error):
+        if callable(self.on_error):
+            self.on_error(f"Event store write failed: {error}")
+
+    def disable(self, error):
+        self.failed = True
+        # Wake anyone waiting in flush().
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        if callable(self.on_error):
+            self.on_error(f"Event store disabled: {error}")
+
+    def flush(self, timeout=2.0):
+        if self.failed or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+        if self.reader is not None:
+            with self.read_lock:
+                self.reader.close()
+
+    def query(self, sql, params=()):
+        if self.reader is None:
+            return []
+        with self.read_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def events(self, kind=None, since=None, until=None, band=None, limit=1000):
+        """Most recent events first, as (ts, kind, button, band, state, color, detail) rows."""
+        clauses, params = [], []
+        for clause, value in (("kind = ?", kind), ("ts >= ?", since), ("ts < ?", until), ("band = ?", band)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(
+            f"SELECT ts, kind, button, band, state, color, detail FROM events{where} ORDER BY ts DESC LIMIT ?",
+            params + [limit],
+        )
+
+    def counts_per_band(self, kind, button=None, days=7.0, bucket=3600):
+        """
+        [(band, bucket start, count), ...] of `kind` events (of `button`, if
+        given) over the last `days`, in `bucket`-second bins of wall time.
+        """
+        since = time.time() - days * 86400
+        button_clause = " AND button = ?" if button is not None else ""
+        params = [bucket, bucket, kind] + ([button] if button is not None else []) + [since]
+        return self.query(
+            "SELECT band, CAST(ts / ? AS INTEGER) * ? AS start, COUNT(*) FROM events"
+            f" WHERE kind = ?{button_clause} AND ts >= ? GROUP BY band, start ORDER BY start, band",
+            params,
+        )
+
+    def qsos_per_band_per_hour(self, days=7.0):
+        # A QSO is an Enable Tx click: the station answered and transmission resumed.
+        return self.counts_per_band("click", button="enable_tx", days=days)
+
+
+def report(path=EVENT_DB, days=7.0):
+    """Prints QSOs per band per hour over the last `days`, with the query time."""
+    from datetime import datetime
+
+    store = EventStore(path)
+    try:
+        started = time.perf_counter()
+        rows = store.qsos_per_band_per_hour(days)
+        elapsed = time.perf_counter() - started
+    finally:
+        store.close()
+    for band, start, count in rows:
+        print(f"{datetime.fromtimestamp(start):%Y-%m-%d %H:00}  {band or '-':>5}  {count}")
+    print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    report(*sys.argv[1:2], *(float(v) for v in sys.argv[2:3]))
@@ -0,0 +1,246 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+MAX_RECORDS = 5000
+EVENT_LOG = "events.jsonl"
+# Repeats of a rate-limited log key within this many seconds are only counted.
+REPEAT_INTERVAL = 10.0
+
+def format_record(record):
+    created, message, _fields = record
+    return f"[{datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+
+
+class LazyMessage:
+    """
+    A log message built by fn(*args) the first time it is shown or written,
+    so messages that are dropped, rate limited or never displayed cost no
+    formatting in the caller's loop.
+    """
+
+    __slots__ = ("fn", "args", "text")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+        self.text = None
+
+    def __str__(self):
+        if self.text is None:
+            self.text = self.fn(*self.args)
+        return self.text
+
+def repeated_message(message, count):
+    return LazyMessage("{} ({} similar messages suppressed)".format, message, count)
+
+
+class LogLimiter:
+    """
+    Per-key rate limit. The first message of a key is shown; repeats within
+    `interval` seconds are only counted. The count rides along with the
+    key's next shown message, or sweep() reports it with the last repeat
+    once the interval is over and nothing else came.
+    """
+
+    def __init__(self, interval=REPEAT_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.keys = {}  # key -> [window end, suppressed count, last suppressed message]
+
+    def allow(self, key, message, now=None):
+        # Returns (show, repeats suppressed since the key was last shown).
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            entry = self.keys.get(key)
+            if entry is not None and now < entry[0]:
+                entry[1] += 1
+                entry[2] = message
+                return False, 0
+            self.keys[key] = [now + self.interval, 0, None]
+            return True, entry[1] if entry is not None else 0
+
+    def sweep(self, now=None):
+        # [(last suppressed message, count), ...] of windows that ended with repeats.
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self.lock:
+            for key, (end, count, message) in list(self.keys.items()):
+                if now >= end:
+                    del self.keys[key]
+                    if count:
+                        expired.append((message, count))
+        return expired
+
+
+class LogBuffer:
+    """
+    Log messages waiting for the GUI, at most `max_records` of them, oldest
+    dropped first; anything older would scroll out of the view anyway.
+    append() is safe from any thread; the GUI drains take_pending() on a
+    timer and shows each batch in one widget update instead of one per message.
+    """
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self.lock = threading.Lock()
+        self.pending = deque(maxlen=max_records)
+
+    def append(self, message, fields=None, created=None):
+        record = (time.time() if created is None else created, message, fields)
+        with self.lock:
+            self.pending.append(record)
+        return record
+
+    def take_pending(self):
+        with self.lock:
+            pending = list(self.pending)
+            self.pending.clear()
+        return [format_record(record) for record in pending]
+
+    def resize(self, max_records):
+        with self.lock:
+            self.pending = deque(self.pending, maxlen=max_records)
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+
+
+class EventLog:
+    """
+    Always-on JSONL log: one object per event (ts, event, message and fields
+    such as button, color, state and band). write() only queues the record;
+    a background thread encodes it into a buffered file, flushes at least
+    every `flush_interval` seconds so tails see it, and rotates the file to
+    PATH.1 .. PATH.<backups> once it passes `max_bytes` or `max_age` seconds.
+    """
+
+    def __init__(self, path=EVENT_LOG, max_bytes=5 * 1024 * 1024, max_age=24 * 3600, backups=5,
+                 flush_interval=1.0, on_error=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.queue = queue.Queue()
+        self.failed = False
+        self.thread = threading.Thread(target=self.run, name="event-log", daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        if not self.failed:
+            self.queue.put(record)
+
+    def encode(self, record):
+        created, message, fields = record
+        event = {
+            'ts': datetime.fromtimestamp(created).isoformat(timespec='milliseconds'),
+            'event': 'log',
+            'message': str(message),
+        }
+        if fields:
+            event.update(fields)
+        return json.dumps(event, default=str) + "\n"
+
+    def open(self):
+        f = open(self.path, 'a', encoding='utf-8', buffering=64 * 1024)
+        # An existing file keeps growing until it is max_age old counted from now.
+        self.opened_at = time.time()
+        self.size = f.tell()
+        return f
+
+    def rotate(self, f):
+        f.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        return self.open()
+
+    def run(self):
+        try:
+            f = self.open()
+        except OSError as e:
+            self.fail(e)
+            return
+        dirty = False
+        flush_due = 0.0
+        while True:
+            try:
+                timeout = max(0.0, flush_due - time.monotonic()) if dirty else None
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            try:
+                if item is None or item is False or isinstance(item, threading.Event):
+                    # Shutting down, idle for flush_interval, or a flush() request.
+                    if dirty:
+                        f.flush()
+                        dirty = False
+                    if item is None:
+                        f.close()
+                        return
+                    if item:
+                        item.set()
+                    continue
+                line = self.encode(item)
+                if self.size and (self.size + len(line) > self.max_bytes or time.time() - self.opened_at > self.max_age):
+                    f = self.rotate(f)
+                f.write(line)
+                self.size += len(line.encode('utf-8'))
+                if not dirty:
+                    dirty = True
+                    flush_due = time.monotonic() + self.flush_interval
+                elif time.monotonic() >= flush_due:
+                    # A steady stream never leaves the queue idle; flush on time anyway.
+                    f.flush()
+                    dirty = False
+            except OSError as e:
+                self.fail(e)
+                return
+
+    def fail(self, error):
+        self.failed = True
+        # Wake anyone waiting in flush().
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        if callable(self.on_error):
+            self.on_error(f"Event log disabled: {error}")
+
+    def flush(self, timeout=2.0):
+        if self.failed or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def files(self):
+        # Oldest first.
+        rotated = [f"{self.path}.{index}" for index in range(self.backups, 0, -1)]
+        return [path for path in rotated + [self.path] if os.path.exists(path)]
+
+    def export(self, destination):
+        """Copies the rotated files and the live one, oldest first, into `destination`."""
+        self.flush()
+        with open(destination, 'wb') as out:
+            for path in self.files():
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
@@ -1,90 +1,54 @@
 import sys
 import signal
 import os
+import copy
+import threading
+import time
 from collections import Counter
-import mss
+from types import MappingProxyType
 import math
 
 if sys.platform == "win32":
     # Suppress non-fatal Qt DPI awareness warning emitted on some Windows setups.
     os.environ.setdefault("QT_LOGGING_RULES", "qt.qpa.window=false")
 
-LOG_FN = None
-CAPTURE_METHOD_LOGGED = set()
-
-def set_log_fn(fn):
-    global LOG_FN
-    LOG_FN = fn
-
-def log_capture_issue(message):
-    if callable(LOG_FN):
-        LOG_FN(message)
-    else:
-        print(message)
-
-def log_capture_method_once(method):
-    if method in CAPTURE_METHOD_LOGGED:
-        return
-    CAPTURE_METHOD_LOGGED.add(method)
-    log_capture_issue(f"Capture method: {method}")
-
-def get_color_name(r, g, b):
-    """
-    Convert RGB values (0-255) to color name.
-    Finds the closest matching color from 30 common colors.
-    """
-    colors = {
-        "red": (255, 0, 0),
-        "green": (0, 128, 0),
-        "blue": (0, 0, 255),
-        "yellow": (255, 255, 0),
-        "orange": (255, 165, 0),
-        "purple": (128, 0, 128),
-        "pink": (255, 192, 203),
-        "brown": (165, 42, 42),
-        "black": (0, 0, 0),
-        "white": (255, 255, 255),
-        "gray": (128, 128, 128),
-        "cyan": (0, 255, 255),
-        "magenta": (255, 0, 255),
-        "lime": (0, 255, 0),
-        "navy": (0, 0, 128),
-        "maroon": (128, 0, 0),
-        "olive": (128, 128, 0),
-        "teal": (0, 128, 128),
-        "silver": (192, 192, 192),
-        "gold": (255, 215, 0),
-        "crimson": (220, 20, 60),
-        "indigo": (75, 0, 130),
-        "violet": (238, 130, 238),
-        "salmon": (250, 128, 114),
-        "coral": (255, 127, 80),
-        "khaki": (240, 230, 140),
-        "tan": (210, 180, 140),
-        "lavender": (230, 230, 250),
-        "turquoise": (64, 224, 208),
-        "beige": (245, 245, 220),
-    }
-
-    min_distance = float("inf")
-    closest_color = None
-    for color_name, (cr, cg, cb) in colors.items():
-        distance = (r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2
-        if distance < min_distance:
-            min_distance = distance
-            closest_color = color_name
-    return closest_color
+from buttonstates import MAX_STATES, ButtonStates
+from capture import CaptureSnapshot, FrameCache, SyntheticBackend, capture_backends, capture_snapshot, frame_cache, get_pixel_color, log_capture_issue, set_capture_backends, set_log_fn
+from classifier import MIN_CONFIDENCE, StateClassifier, palette_state
+from colornames import get_color_name
+from eventstore import EVENT_DB, EventStore
+from logbuffer import EVENT_LOG, MAX_RECORDS, REPEAT_INTERVAL, EventLog, LazyMessage, LogBuffer, LogLimiter, repeated_message
+from recording import CaptureRecorder, CaptureReplay
+from relocate import ButtonRelocator, capture_template, decode_template, encode_template
+from scheduling import ClickDispatcher, SlotClock, SlotPollScheduler
+from settings import SettingsStore
+from windows import DEFAULT_TITLE, window_locator
+
+def mouse():
+    # pyautogui needs a display as soon as it is imported; headless synthetic runs never load it.
+    import pyautogui
+    return pyautogui
 
 def format_color_samples(colors, limit=3):
     if not colors:
         return "[]"
     samples = []
-    for color, count in Counter(colors).most_common(limit):
+    if hasattr(colors, "most_common"):
+        counts = colors.most_common(limit)
+    else:
+        counts = Counter(colors).most_common(limit)
+    for color, count in counts:
         r, g, b = color
         name = get_color_name(r, g, b)
         samples.append(f"{name} {color} x{count}")
     return ", ".join(samples)
 
+def learned_state_message(button_type, state, color, colors):
+    return (
+        f"Learned new state for {button_type}: {state_display(state)} with color "
+        f"`{get_color_name(*color)}` {color}, sampled: {format_color_samples(colors)}"
+    )
+
 def state_display(state):
     if state == "active":
         return "ON"
@@ -92,145 +56,10 @@ def state_display(state):
         return "OFF"
     return state
 
-def get_pixel_color(x, y):
-    # Cross-platform pixel color detection w multi-monitor support
-    try:
-        if sys.platform == "darwin":
-            # macOS: Prefer window-based capture at point to avoid desktop background
-            import struct
-            from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
-            from Quartz import CGWindowListCreateImage, kCGWindowListOptionIncludingWindow
-            from Quartz import kCGWindowImageDefault, kCGWindowImageBoundsIgnoreFraming, kCGWindowImageBestResolution
-            from Quartz import CGImageGetDataProvider, CGDataProviderCopyData, CGImageGetBytesPerRow
-            from Quartz import CGImageGetWidth, CGImageGetHeight
-            from Quartz import CoreGraphics as CG
-
-            window_list = CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or []
-            window_id = None
-            window_bounds = None
-            for info in window_list:
-                bounds = info.get("kCGWindowBounds")
-                if not bounds:
-                    continue
-                bx = bounds.get("X")
-                by = bounds.get("Y")
-                bw = bounds.get("Width")
-                bh = bounds.get("Height")
-                if bx is None or by is None or bw is None or bh is None:
-                    continue
-                if bx <= x < bx + bw and by <= y < by + bh:
-                    window_id = info.get("kCGWindowNumber")
-                    window_bounds = (bx, by, bw, bh)
-                    break
-
-            if window_id is not None:
-                log_capture_method_once("macOS window image")
-                bx, by, bw, bh = window_bounds
-                window_rect = CG.CGRectMake(int(bx), int(by), int(bw), int(bh))
-                image = CGWindowListCreateImage(
-                    window_rect,
-                    kCGWindowListOptionIncludingWindow,
-                    window_id,
-                    kCGWindowImageBoundsIgnoreFraming | kCGWindowImageBestResolution,
-                )
-            else:
-                log_capture_method_once("macOS window image (no window found)")
-                image = None
-
-            if image:
-                data_provider = CGImageGetDataProvider(image)
-                data = CGDataProviderCopyData(data_provider)
-                buf = bytes(data)
-                bytes_per_row = CGImageGetBytesPerRow(image)
-                img_width = CGImageGetWidth(image)
-                img_height = CGImageGetHeight(image)
-                bx, by, bw, bh = window_bounds
-                local_x = int(x - bx)
-                local_y = int(y - by)
-                if 0 <= local_x < img_width and 0 <= local_y < img_height:
-                    colors = []
-                    for dy in range(-4, 5):
-                        for dx in range(-4, 5):
-                            px = local_x + dx
-                            py = local_y + dy
-                            if 0 <= px < img_width and 0 <= py < img_height:
-                                i = py * bytes_per_row + px * 4
-                                b, g, r, a = struct.unpack_from("BBBB", buf, i)
-                                colors.append((r, g, b))
-                    if colors:
-                        most_common = Counter(colors).most_common(1)[0][0]
-                        return most_common, colors
-                log_capture_issue("Capture method: macOS window image (point outside window image)")
-
-        with mss.mss() as sct:
-            log_capture_method_once("mss virtual screen")
-            virtual = sct.monitors[0]
-            v_left = virtual["left"]
-            v_top = virtual["top"]
-            v_right = v_left + virtual["width"]
-            v_bottom = v_top + virtual["height"]
-
-            if not (v_left <= x < v_right and v_top <= y < v_bottom):
-                return (128, 128, 128), []
-
-            monitor = None
-            for m in sct.monitors[1:]:
-                m_left = m["left"]
-                m_top = m["top"]
-                m_right = m_left + m["width"]
-                m_bottom = m_top + m["height"]
-                if m_left <= x < m_right and m_top <= y < m_bottom:
-                    monitor = m
-                    break
-            if monitor is None:
-                monitor = virtual
-
-            left = max(monitor["left"], x - 4)
-            top = max(monitor["top"], y - 4)
-            right = min(monitor["left"] + monitor["width"], x + 5)
-            bottom = min(monitor["top"] + monitor["height"], y + 5)
-            width = max(0, right - left)
-            height = max(0, bottom - top)
-            if width == 0 or height == 0:
-                return (128, 128, 128), []
-
-            img = sct.grab({"left": left, "top": top, "width": width, "height": height})
-            raw = img.raw  # BGRA bytes
-            colors = []
-            for i in range(width * height):
-                b = raw[i * 4]
-                g = raw[i * 4 + 1]
-                r = raw[i * 4 + 2]
-                colors.append((r, g, b))
-
-            if colors:
-                most_common = Counter(colors).most_common(1)[0][0]
-                return most_common, colors
-            return (128, 128, 128), []
-    except Exception as e:
-        msg = str(e)
-        if "could not create image" in msg.lower() or "display" in msg.lower():
-            log_capture_issue("Screen capture failed. On macOS, grant Screen Recording permission to the Python app (System Settings → Privacy & Security → Screen Recording).")
-        else:
-            log_capture_issue(f"Screen capture failed: {e}")
-        colors = []
-        for i in range(-4, 5):
-            for j in range(-4, 5):
-                try:
-                    color = pyautogui.pixel(x + i, y + j)
-                    colors.append(color)
-                except Exception:
-                    pass
-        if colors:
-            most_common = Counter(colors).most_common(1)[0][0]
-            return most_common, colors
-        return (128, 128, 128), []
 from PyQt6.QtCore import *
 from PyQt6.QtCore import pyqtProperty
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
-import pyautogui
-import json
 from datetime import datetime
 
 class DelayedTooltipButton(QPushButton):
@@ -512,10 +341,176 @@ class ArcProgress(QWidget):
         else:
             return QColor(255, 0, 0)  # Red
 
+class CaptureWorker(QObject):
+    """
+    Polls the learned buttons on a background thread and publishes each
+    tick as an immutable CaptureSnapshot, so a stalled grab never blocks the GUI.
+    """
+    snapshot_ready = pyqtSignal(object)
+    button_moved = pyqtSignal(str, int, int)
+    window_moved = pyqtSignal(int, int)
+    # Learned positions are checked against their templates this often (seconds).
+    RELOCATE_INTERVAL = 5.0
+
+    def __init__(self, interval_ms=1000):
+        super().__init__()
+        self.interval_ms = interval_ms
+        self.scheduler = None
+        self.points_lock = threading.Lock()
+        self.points = {}
+        self.templates = {}
+        self.offsets = {}
+        self.window_locator = None
+        self.window_origin = None
+        self.relocator = ButtonRelocator()
+        self.next_relocate = 0.0
+        self.recorder = None
+        self.timer = None
+
+    def set_points(self, points, templates=None, offsets=None):
+        # Called from the GUI thread whenever learned positions change.
+        with self.points_lock:
+            self.points = {button: (int(pos[0]), int(pos[1])) for button, pos in points.items()}
+            self.templates = dict(templates or {})
+            self.offsets = {button: (int(dx), int(dy)) for button, (dx, dy) in (offsets or {}).items()}
+
+    def set_window_locator(self, locator):
+        with self.points_lock:
+            self.window_locator = locator
+            self.window_origin = None
+
+    def follow_window(self):
+        # One geometry query per tick; buttons with a window offset move with the window.
+        with self.points_lock:
+            locator = self.window_locator
+            offsets = self.offsets
+        if locator is None or not offsets:
+            return
+        try:
+            geometry = locator.locate()
+        except Exception as e:
+            log_capture_issue(f"Window tracking through {locator.name} failed, disabled: {e}")
+            self.set_window_locator(None)
+            return
+        if geometry is None or geometry[:2] == self.window_origin:
+            return
+        left, top = self.window_origin = geometry[:2]
+        with self.points_lock:
+            points = dict(self.points)
+            for button, (dx, dy) in offsets.items():
+                if button in points:
+                    points[button] = (left + dx, top + dy)
+            changed = points != self.points
+            self.points = points
+        if changed:
+            self.window_moved.emit(left, top)
+
+    def set_recorder(self, recorder):
+        with self.points_lock:
+            self.recorder = recorder
+
+    @pyqtSlot()
+    def start(self):
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+        self.update_cache_ttl()
+        self.tick()
+
+    def update_cache_ttl(self):
+        # Reuse anything captured within the last half tick instead of grabbing it again.
+        if self.scheduler is not None:
+            frame_cache().ttl = self.scheduler.fast_interval / 2
+        else:
+            frame_cache().ttl = self.interval_ms / 2000
+
+    def schedule_next(self):
+        if self.timer is None:
+            return
+        if self.scheduler is not None:
+            delay_ms = int(self.scheduler.next_delay() * 1000)
+        else:
+            delay_ms = self.interval_ms
+        self.timer.start(max(1, delay_ms))
+
+    @pyqtSlot()
+    def tick(self):
+        self.poll()
+        if time.monotonic() >= self.next_relocate:
+            self.next_relocate = time.monotonic() + self.RELOCATE_INTERVAL
+            self.check_positions()
+        self.schedule_next()
+
+    def check_positions(self):
+        with self.points_lock:
+            points = self.points
+            templates = self.templates
+        if not templates:
+            return
+        try:
+            moved = self.relocator.check(templates, points)
+        except Exception as e:
+            log_capture_issue(f"Button relocation failed: {e}")
+            return
+        for button, (x, y) in moved.items():
+            self.button_moved.emit(button, x, y)
+
+    @pyqtSlot(int)
+    def set_interval(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.update_cache_ttl()
+        if self.scheduler is None:
+            self.schedule_next()
+
+    @pyqtSlot(object)
+    def set_scheduler(self, scheduler):
+        self.scheduler = scheduler
+        self.update_cache_ttl()
+        self.schedule_next()
+
+    @pyqtSlot()
+    def poll(self):
+        self.follow_window()
+        with self.points_lock:
+            points = self.points
+            recorder = self.recorder
+        if self.scheduler is not None:
+            self.scheduler.record_poll()
+        try:
+            snapshot = capture_snapshot(points)
+        except Exception as e:
+            log_capture_issue(f"Warning: Could not capture learned buttons: {e}")
+            return
+        if recorder is not None:
+            try:
+                recorder.record(snapshot, points)
+            except Exception as e:
+                log_capture_issue(f"Capture recording failed: {e}")
+                self.set_recorder(None)
+        self.snapshot_ready.emit(snapshot)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+        capture_backends().close()
+
 class FT8Clicker(QMainWindow):
-    def __init__(self, startup_progress=None):
+    capture_interval_changed = pyqtSignal(int)
+    capture_schedule_changed = pyqtSignal(object)
+    capture_requested = pyqtSignal()
+    settings_file_changed = pyqtSignal(object)
+    GRAPH_MAX_BARS = 100
+
+    def __init__(self, startup_progress=None, synthetic=False):
         super().__init__()
         self.startup_progress = startup_progress
+        # With synthetic=True an in-memory framebuffer stands in for the screen
+        # and clicks are only counted, so the app runs on a box with no display.
+        self.synthetic_backend = SyntheticBackend() if synthetic else None
+        self.synthetic_clicks = Counter()
+        if synthetic:
+            set_capture_backends([self.synthetic_backend])
         self.click_history = []
         self.current_bar_start = None  # For real-time growing bar
         self.graph_label_font = 6
@@ -523,17 +518,31 @@ class FT8Clicker(QMainWindow):
         self.graph_min_height = 55
         self.log_expanded_min_height = 150
         self.footer_min_height = 20
+        self.log_buffer = LogBuffer()
+        self.log_limiter = LogLimiter()
+        # log() reads this, and EventLog may call it from its thread straight away.
+        self.replaying = False
         self.report_startup_progress(0, "Loading settings...")
         self.settings_file = 'settings.json'
         self.load_settings()
+        self.log_limiter.interval = float(self.settings.get('log_repeat_interval', REPEAT_INTERVAL))
+        self.event_log = EventLog(
+            self.settings.get('event_log_path', EVENT_LOG),
+            max_bytes=int(self.settings.get('event_log_max_bytes', 5 * 1024 * 1024)),
+            max_age=float(self.settings.get('event_log_max_age', 24 * 3600)),
+            backups=int(self.settings.get('event_log_backups', 5)),
+            on_error=self.log,
+        )
+        self.event_store = EventStore(self.settings.get('event_db_path', EVENT_DB), on_error=self.log)
         self.report_startup_progress(1, "Building interface...")
         self.init_ui()
         self.report_startup_progress(2, "Checking permissions...")
         self.check_screen_recording_permission()
         set_log_fn(self.log)
+        self.watch_screen_configuration()
+        self.watch_settings_file()
         self.report_startup_progress(3, "Preparing timers...")
         self.setup_timers()
-        self.color_timer.start(1000)
         self.learning = False
         self.current_band = '40m'
         self.running = False
@@ -553,6 +562,23 @@ class FT8Clicker(QMainWindow):
         self.display_names = {'enable_tx': 'Enable Tx', 'tx6': 'Tx 6'}
         self.last_button_states = {}
         self.flash_restore_styles = {}
+        self.slot_scheduler = None
+        self.slot_clock = SlotClock()
+        self.click_dispatcher = ClickDispatcher(clock=self.slot_clock.now)
+        self.dispatch_timer = QTimer()
+        self.dispatch_timer.setSingleShot(True)
+        self.dispatch_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.dispatch_timer.timeout.connect(self.release_queued_clicks)
+        self.last_click_times = {}
+        self.last_button_digests = {}
+        self.unsure_shades = {}  # button -> (digest, consecutive low-confidence samples)
+        self.state_classifiers = {}
+        self.capture_recorder = None
+        self.replay_clock = None
+        # Replayed samples live here, not in the frame cache the live worker fills.
+        self.replay_cache = None
+        self.replay_clicks = Counter()
+        self.setup_capture_worker()
         self.report_startup_progress(4, "Finalizing...")
 
     def report_startup_progress(self, step, message):
@@ -586,43 +612,30 @@ class FT8Clicker(QMainWindow):
             "QPushButton { background-color: #1f1f1f; color: #f5f5f5; border: 1px solid #4a4a4a; border-radius: 5px; padding: 6px; }"
             "QPushButton:hover { background-color: #2a2a2a; }"
             "QPushButton:pressed { background-color: #363636; }"
-            "QTextEdit { background-color: #080808; color: #e0e0e0; border: 1px solid #333333; }"
+            "QTextEdit, QPlainTextEdit { background-color: #080808; color: #e0e0e0; border: 1px solid #333333; }"
             "QLineEdit, QSpinBox, QDoubleSpinBox, QCheckBox, QLabel { color: #f0f0f0; }"
             "QToolTip { background-color: #161616; color: #ffffff; border: 1px solid #666666; }"
         )
 
     def load_settings(self):
-        if os.path.exists(self.settings_file):
-            with open(self.settings_file, 'r') as f:
-                self.settings = json.load(f)
-        else:
-            self.settings = {
-                'click_interval': 1.0,
-                'visible_bands': ['40m', '20m', '17m', '15m', '12m', '10m'],
-                'cq_time': 200,
-                'cqs_remaining': 3,
-                'app_time': 60*60,
-                'learned_buttons': {},
-                'window_geometry': {'x': 100, 'y': 100, 'width': 1200, 'height': 800},
-                    'log_expanded': True,
-                    'current_band': '40m',
-                    'window_maximized': False
-            }
+        # Defaults and schema migrations live in settings.py; learned shades are parsed on first use.
+        self.settings = SettingsStore(self.settings_file, on_error=self.log)
+        self.settings.writer.interval = float(self.settings.get('settings_write_interval', 2.0))
         self.visible_bands = self.settings.get('visible_bands', ['40m', '20m', '17m', '15m', '12m', '10m'])
-        self.learned_buttons = self.settings.get('learned_buttons', {})
-        if 'tx_enable' in self.learned_buttons and 'enable_tx' not in self.learned_buttons:
-            self.learned_buttons['enable_tx'] = self.learned_buttons.pop('tx_enable')
-        # Convert old format to new
-        for btn, data in self.learned_buttons.items():
-            if 'color' in data:
-                data['states'] = {str(data['color']): 'inactive'}
-                del data['color']
+        self.learned_buttons = {
+            button: {**data, 'states': self.new_button_states(data.get('states'))}
+            for button, data in self.settings.get('learned_buttons', {}).items()
+        }
+        self.saved_learned_buttons = self.learned_buttons_signature()
         self.click_interval = self.settings.get('click_interval', 0.5)
         self.refresh_timer_settings_cache()
         self.cq_remaining = self.persistent_cq_time
         self.app_remaining = self.persistent_app_time
         self.cqs_remaining = self.persistent_cqs_remaining
 
+    def new_button_states(self, states=None):
+        return ButtonStates(states, max_states=int(self.settings.get('max_button_states', MAX_STATES)))
+
     def refresh_timer_settings_cache(self):
         # Keep persistent timer defaults separate from runtime countdown values.
         self.persistent_cq_time = int(self.settings.get('cq_time', 90))
@@ -638,13 +651,32 @@ class FT8Clicker(QMainWindow):
         return int(mapping.get(timer_name, 0))
 
     def save_settings(self):
+        if self.replaying:
+            # Shades seen during a replay must not leak into the saved learned states.
+            return
         # Persist only configured defaults; runtime +/- controls do not write these.
         self.settings['cq_time'] = int(self.persistent_cq_time)
         self.settings['cqs_remaining'] = int(self.persistent_cqs_remaining)
         self.settings['app_time'] = int(self.persistent_app_time)
-        self.settings['learned_buttons'] = self.learned_buttons
-        with open(self.settings_file, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+        signature = self.learned_buttons_signature()
+        if signature != self.saved_learned_buttons:
+            # The learned table is the bulk of the file; only re-encode it when it changed.
+            self.settings['learned_buttons'] = {
+                button: {**data, 'states': data['states'].to_json()}
+                for button, data in self.learned_buttons.items()
+            }
+            self.saved_learned_buttons = signature
+        if hasattr(self, 'states_save_timer'):
+            self.states_save_timer.stop()
+        # The writer thread encodes the changed keys and replaces the file.
+        self.settings.save()
+
+    def learned_buttons_signature(self):
+        return tuple(
+            (button, id(data['states']), data['states'].version, tuple(data['pos']),
+             repr(data.get('offset')), id(data.get('template')))
+            for button, data in self.learned_buttons.items()
+        )
 
     def init_ui(self):
         self.apply_dark_theme()
@@ -797,9 +829,16 @@ class FT8Clicker(QMainWindow):
 
         self.log_content = QWidget()
         log_content_layout = QVBoxLayout(self.log_content)
-        self.log_text = QTextEdit()
+        # Plain text with a block cap: appends stay cheap and old lines fall off the top.
+        max_lines = int(self.settings.get('log_max_lines', MAX_RECORDS))
+        self.log_buffer.resize(max_lines)
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(max_lines)
         log_content_layout.addWidget(self.log_text)
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+        self.log_flush_timer.start(int(self.settings.get('log_flush_ms', 200)))
 
         log_btn_row = QHBoxLayout()
         clear_log_btn = QPushButton("Clear Log")
@@ -808,6 +847,12 @@ class FT8Clicker(QMainWindow):
         export_log_btn = QPushButton("Export Log")
         export_log_btn.clicked.connect(self.export_log)
         log_btn_row.addWidget(export_log_btn)
+        self.record_btn = QPushButton("Record Capture")
+        self.record_btn.clicked.connect(self.toggle_capture_recording)
+        log_btn_row.addWidget(self.record_btn)
+        replay_btn = QPushButton("Replay Capture")
+        replay_btn.clicked.connect(self.choose_capture_replay)
+        log_btn_row.addWidget(replay_btn)
         log_content_layout.addLayout(log_btn_row)
         log_layout.addWidget(self.log_content)
         self.log_group.toggled.connect(self.on_log_group_toggled)
@@ -900,7 +945,7 @@ class FT8Clicker(QMainWindow):
         if not self.learning or not self.button_to_learn:
             return
         try:
-            x, y = pyautogui.position()
+            x, y = mouse().position()
             try:
                 color, colors = get_pixel_color(x, y)
             except Exception as pixel_error:
@@ -908,7 +953,19 @@ class FT8Clicker(QMainWindow):
                 color, colors = (128, 128, 128), []  # default gray
             button_type = self.button_to_learn
             initial_state = "inactive"
-            self.learned_buttons[button_type] = {'pos': (x, y), 'states': {str(color): initial_state}}
+            states = self.new_button_states()
+            states.learn(color, initial_state)
+            self.learned_buttons[button_type] = {'pos': (x, y), 'states': states}
+            self.learn_window_offset(button_type, x, y)
+            try:
+                template = capture_template(x, y)
+            except Exception as template_error:
+                self.log(f"Warning: Could not capture a template for {button_type}: {template_error}")
+                template = None
+            if template is not None:
+                # Lets the capture worker find the button again if the FT8 window moves.
+                self.learned_buttons[button_type]['template'] = encode_template(template)
+            self.state_classifiers.pop(button_type, None)
             self.learning = False
             self.button_to_learn = None
             self.log(
@@ -917,6 +974,7 @@ class FT8Clicker(QMainWindow):
                 f"sampled: {format_color_samples(colors)}"
             )
             self.save_settings()
+            self.sync_capture_points()
             self.band_order = [b for b in self.all_bands if b in self.learned_buttons and b in self.visible_bands]
             self.current_band_index = self.band_order.index(self.current_band) if self.current_band in self.band_order else 0
             self.learn_btn.setText("LEARN")
@@ -974,13 +1032,11 @@ class FT8Clicker(QMainWindow):
                 if button_type in self.learned_buttons:
                     pos = self.learned_buttons[button_type]['pos']
                     try:
-                        current_color, _ = get_pixel_color(pos[0], pos[1])
-                        states = self.learned_buttons[button_type]['states']
-                        current_state = states.get(str(current_color), 'unknown')
+                        current_state = self.snapshot_state(button_type)
                         self.log(f"Button {button_type} state: {current_state}")
                     except Exception as e:
                         self.log(f"Error getting state for {button_type}: {e}")
-                    pyautogui.moveTo(pos[0], pos[1])
+                    mouse().moveTo(pos[0], pos[1])
                     self.log(f"Moved mouse to {button_type} position")
                     self.locating = False
                     self.button_to_locate = None
@@ -997,10 +1053,10 @@ class FT8Clicker(QMainWindow):
             elif button_type in self.learned_buttons:
                 pos = self.learned_buttons[button_type]['pos']
                 try:
-                    current_pos = pyautogui.position()
-                    pyautogui.click(pos[0], pos[1])
-                    pyautogui.moveTo(current_pos[0], current_pos[1])
-                    self.log(f"Manual click on {button_type}")
+                    self.send_click(button_type, pos)
+                    self.last_click_times[button_type] = time.monotonic()
+                    self.log(f"Manual click on {button_type}", event='click', button=button_type,
+                             band=self.current_band, manual=True)
                     # Decrement CQ counter if CQ button was clicked manually
                     if button_type == 'tx6' and self.cqs_remaining > 0:
                         self.consume_cq_try("Manual")
@@ -1011,16 +1067,31 @@ class FT8Clicker(QMainWindow):
             else:
                 self.log(f"{button_type} not learned")
 
+    def send_click(self, button_type, pos):
+        if self.synthetic_backend is not None:
+            # Nothing behind the synthetic framebuffer to click.
+            self.synthetic_clicks[button_type] += 1
+            return
+        pyautogui = mouse()
+        current_pos = pyautogui.position()
+        pyautogui.click(pos[0], pos[1])
+        pyautogui.moveTo(current_pos[0], current_pos[1])
+
     def click_learned_button(self, button_type, log_message=None, graph_event=None):
         if button_type not in self.learned_buttons:
             return False
         pos = self.learned_buttons[button_type]['pos']
         try:
-            current_pos = pyautogui.position()
-            pyautogui.click(pos[0], pos[1])
-            pyautogui.moveTo(current_pos[0], current_pos[1])
+            if self.replaying:
+                # Replays exercise the automation logic without touching the mouse.
+                self.replay_clicks[button_type] += 1
+            else:
+                self.send_click(button_type, pos)
+            self.last_click_times[button_type] = time.monotonic()
             if log_message:
-                self.log(log_message)
+                # CQ and band-change clicks get their own kinds; the rest are plain clicks.
+                kind = graph_event if graph_event in ('cq', 'band_change') else 'click'
+                self.log(log_message, event=kind, button=button_type, band=self.current_band)
             if graph_event:
                 self.update_graph(graph_event)
             
@@ -1085,11 +1156,13 @@ class FT8Clicker(QMainWindow):
             self.app_arc.setValue(self.app_remaining, self.timer_setting_value('app'))
             self.cq_timer.start(1000)
             self.app_timer.start(1000)
-            self.color_timer.start(1000)
             self.graph_timer.start(100)  # Update graph every 100ms for smooth growing bar
             self.click_timer = QTimer()
             self.click_timer.timeout.connect(self.clicking_loop)
             self.click_timer.start(int(self.click_interval * 1000))
+            self.configure_click_dispatch()
+            self.update_capture_interval()
+            frame_cache().reset_stats()
             self.band_cycle_counter = 0
             self.short_qso_count = 0
             self.last_tx_time = None
@@ -1098,15 +1171,22 @@ class FT8Clicker(QMainWindow):
     def stop_clicking(self):
         # Finalize any growing bar
         if hasattr(self, 'current_bar_start') and self.current_bar_start is not None:
-            timestamp = datetime.now()
+            timestamp = self.now()
             duration = (timestamp - self.current_bar_start).total_seconds()
             self.click_history.append((self.current_bar_start, timestamp, 'stop', duration))
             self.current_bar_start = None
-            self.plot_graph()
+            if not self.replaying:
+                self.plot_graph()
             
         self.running = False
         self.status_label.setText("Countdown Timers")
         self.log("Stopped clicking")
+        stats = frame_cache().stats()
+        self.log(
+            f"Capture cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['captures']} button captures"
+        )
+        self.log_capture_rate()
         self.start_btn.setText("STOPPED")
         self.start_btn.setStyleSheet("background-color: red; color: white;")
         self.cq_timer.stop()
@@ -1114,6 +1194,9 @@ class FT8Clicker(QMainWindow):
         self.graph_timer.stop()
         if hasattr(self, 'click_timer'):
             self.click_timer.stop()
+        self.click_dispatcher.clear()
+        self.dispatch_timer.stop()
+        self.update_capture_interval()
 
     def clicking_loop(self):
         if not self.running:
@@ -1121,37 +1204,81 @@ class FT8Clicker(QMainWindow):
         if self.enable_tx_cooldown:
             return
         if 'enable_tx' in self.learned_buttons:
-            pos = self.learned_buttons['enable_tx']['pos']
             try:
-                current_color, _ = get_pixel_color(pos[0], pos[1])
-                states = self.learned_buttons['enable_tx']['states']
-                current_state = states.get(str(current_color), 'unknown')
+                current_state = self.snapshot_state('enable_tx')
                 if current_state == 'inactive':  # Only click if inactive to enable
-                    self.click_learned_button('enable_tx', "Auto-clicked Enable Tx", 'enable_tx')
-                    self.cq_remaining = self.timer_setting_value('cq')
-                    self.enable_tx_cooldown = True
-                    self.cooldown_timer.start(2000)  # 2 second cooldown
+                    self.queue_click('enable_tx', self.release_enable_tx)
             except Exception as e:
                 self.log(f"Error in clicking loop for enable_tx: {e}")
 
+    def release_enable_tx(self):
+        # The state may have changed while the click waited for the slot edge.
+        if self.enable_tx_cooldown or self.snapshot_state('enable_tx') != 'inactive':
+            return
+        self.click_learned_button('enable_tx', "Auto-clicked Enable Tx", 'enable_tx')
+        self.cq_remaining = self.timer_setting_value('cq')
+        self.enable_tx_cooldown = True
+        self.cooldown_timer.start(2000)  # 2 second cooldown
+
     def auto_cq(self):
         if self.running:
             self.cq_remaining -= 1
             self.cq_arc.setValue(self.cq_remaining, self.timer_setting_value('cq'))
             if self.cq_remaining <= 0:
                 if 'tx6' in self.learned_buttons:
-                    pos = self.learned_buttons['tx6']['pos']
                     try:
-                        current_color, _ = get_pixel_color(pos[0], pos[1])
-                        states = self.learned_buttons['tx6']['states']
-                        current_state = states.get(str(current_color), 'unknown')
+                        current_state = self.snapshot_state('tx6')
                         if current_state == 'inactive':  # Only click if inactive to send CQ
-                            self.click_learned_button('tx6', "Auto-clicked CQ", 'cq')
-                            self.cq_remaining = self.timer_setting_value('cq')
-                            self.cq_arc.setValue(self.cq_remaining, self.timer_setting_value('cq'))
+                            self.queue_click('tx6', self.release_cq)
                     except Exception as e:
                         self.log(f"Error in auto_cq: {e}")
 
+    def release_cq(self):
+        if self.snapshot_state('tx6') != 'inactive':
+            return
+        self.click_learned_button('tx6', "Auto-clicked CQ", 'cq')
+        self.cq_remaining = self.timer_setting_value('cq')
+        self.cq_arc.setValue(self.cq_remaining, self.timer_setting_value('cq'))
+
+    def configure_click_dispatch(self):
+        self.slot_clock.offset = float(self.settings.get('clock_offset', 0.0))
+        self.slot_clock.resync()
+        self.click_dispatcher = ClickDispatcher(
+            lead_time=float(self.settings.get('click_lead_time', 1.0)),
+            parity=self.settings.get('tx_slot_parity'),
+            clock=self.slot_clock.now,
+        )
+
+    def queue_click(self, button_type, action):
+        # Hold automation clicks until just before the next FT8 slot edge; a click
+        # landing just after the edge would make WSJT-X sit out a whole period.
+        if self.replaying or not self.settings.get('slot_dispatch', True):
+            action()
+            return
+        if not self.click_dispatcher.submit(button_type, action):
+            return
+        delay = self.click_dispatcher.release_delay()
+        if delay > 0:
+            name = self.display_names.get(button_type, button_type)
+            self.log(f"{name} click queued for the next slot ({delay:.1f}s)")
+        if not self.dispatch_timer.isActive():
+            self.dispatch_timer.start(int(delay * 1000))
+
+    def release_queued_clicks(self):
+        if not self.running:
+            self.click_dispatcher.clear()
+            return
+        delay = self.click_dispatcher.release_delay()
+        if delay > 0.05:
+            # Woke early; wait out the rest of the slot.
+            self.dispatch_timer.start(int(delay * 1000))
+            return
+        for action in self.click_dispatcher.release():
+            try:
+                action()
+            except Exception as e:
+                self.log(f"Error releasing queued click: {e}")
+
     def auto_stop(self):
         if self.running:
             self.app_remaining -= 1
@@ -1174,11 +1301,8 @@ class FT8Clicker(QMainWindow):
         next_index = (current_index + 1) % len(self.band_order)
         new_band = self.band_order[next_index]
         if new_band in self.learned_buttons:
-            pos = self.learned_buttons[new_band]['pos']
             try:
-                current_color, _ = get_pixel_color(pos[0], pos[1])
-                states = self.learned_buttons[new_band]['states']
-                current_state = states.get(str(current_color), 'unknown')
+                current_state = self.snapshot_state(new_band)
                 if current_state != 'active':  # Only click if not already active
                     if self.click_learned_button(new_band, f"Changed to band {new_band}", 'band_change'):
                         self.current_band_index = next_index
@@ -1196,7 +1320,7 @@ class FT8Clicker(QMainWindow):
                 self.log(f"Error in change_band: {e}")
 
     def update_graph(self, event_type):
-        timestamp = datetime.now()
+        timestamp = self.now()
         
         # If there's a current growing bar, finalize it with the event color
         if hasattr(self, 'current_bar_start') and self.current_bar_start is not None:
@@ -1217,83 +1341,121 @@ class FT8Clicker(QMainWindow):
                 if duration < 5:
                     self.short_qso_count += 1
                     if self.short_qso_count >= 3:
-                        self.log("Runaway detected: 3 short QSOs (<5s) in a row, stopping automation.")
+                        self.log("Runaway detected: 3 short QSOs (<5s) in a row, stopping automation.",
+                                 event='runaway_stop', band=self.current_band)
                         self.stop_clicking()
                 else:
                     self.short_qso_count = 0
             self.last_tx_time = timestamp
         
-        self.plot_graph()
+        if not self.replaying:
+            self.plot_graph()
 
-    def plot_graph(self):
+    def now(self):
+        # Wall clock for click history; replays run on the recording's clock instead.
+        if self.replaying and self.replay_clock is not None:
+            return self.replay_clock
+        return datetime.now()
+
+    def build_graph(self):
+        """
+        Creates the timeline axes, a pool of bar artists and the growing bar
+        once. plot_graph() only restyles and re-colors them; the growing bar
+        is animated and blitted over a cached background between events.
+        """
         self.figure.clear()
         self.figure.patch.set_facecolor('#000000')
-        ax = self.figure.add_subplot(111)
-        self.apply_fixed_graph_margins(ax)
+        ax = self.graph_axes = self.figure.add_subplot(111)
         ax.set_facecolor('#000000')
-        small_font = self.graph_label_font
-        tiny_font = self.graph_tick_font
-        
-        if not self.click_history and self.current_bar_start is None:
-            ax.set_xlim(0, 10)
-            ax.set_ylim(0, 30)
-            ax.text(0.5, 0.5, 'No graph data yet', transform=ax.transAxes, ha='center', va='center', color='#bfbfbf', fontsize=small_font)
-            ax.grid(True, which='both', axis='y', color='#2b2b2b', alpha=0.8)
-            ax.set_xlabel('')
-            ax.set_ylabel('Seconds', fontsize=small_font, labelpad=2)
-            ax.set_title('')
-            ax.xaxis.label.set_color('#d9d9d9')
-            ax.yaxis.label.set_color('#d9d9d9')
-            ax.title.set_color('#f2f2f2')
-            ax.tick_params(axis='x', colors='#cfcfcf', labelsize=tiny_font, pad=1)
-            ax.tick_params(axis='y', colors='#cfcfcf', labelsize=tiny_font, pad=1)
-            for spine in ax.spines.values():
-                spine.set_color('#4a4a4a')
-            self.canvas.draw()
-            return
-            
-        colors = {'enable_tx': 'green', 'cq': 'yellow', 'band_change': 'orange', 'stop': 'red'}
-        color_names = {'enable_tx': 'Enable TX', 'cq': 'CQ Call', 'band_change': 'Band Change', 'stop': 'Stop'}
-        
-        # Plot completed bars (show last 100, or less initially)
-        bars = []
-        max_bars = min(100, max(10, len(self.click_history) + (1 if self.current_bar_start else 0)))
-        start_index = max(0, len(self.click_history) - (max_bars - (1 if self.current_bar_start else 0)))
-        for i, (start_time, end_time, event_type, duration) in enumerate(self.click_history[start_index:], start_index):  
-            bar = ax.bar(i - start_index, duration, color=colors.get(event_type, 'blue'), width=0.8)
-            bars.append((bar[0], start_time, end_time, event_type, duration, i + 1))
-        
-        # Plot current growing bar (grey)
-        if hasattr(self, 'current_bar_start') and self.current_bar_start is not None:
-            current_duration = (datetime.now() - self.current_bar_start).total_seconds()
-            bar_position = len(self.click_history) - start_index
-            growing_bar = ax.bar(bar_position, current_duration, color='grey', width=0.8, alpha=0.7)
-            bars.append((growing_bar[0], self.current_bar_start, None, 'growing', current_duration, len(self.click_history) + 1))
-        
-        # Set axis limits - X auto-scales from 10 to 100, Y auto-scales with initial max 30
-        ax.set_xlim(-0.5, max_bars - 0.5)
-        # Y axis auto-scales, but ensure it starts at 0 and has a reasonable initial range
-        y_max = max(30, max([duration for _, _, _, _, duration, _ in bars] + [30]))
-        ax.set_ylim(0, y_max)
-        
         # Add light grey horizontal lines
         ax.grid(True, which='both', axis='y', color='#2b2b2b', alpha=0.8)
-        
         ax.set_xlabel('')
-        ax.set_ylabel('Seconds', fontsize=small_font, labelpad=2)
+        ax.set_ylabel('Seconds')
         ax.set_title('')
         ax.xaxis.label.set_color('#d9d9d9')
         ax.yaxis.label.set_color('#d9d9d9')
         ax.title.set_color('#f2f2f2')
-        ax.tick_params(axis='x', colors='#cfcfcf', labelsize=tiny_font, pad=1)
-        ax.tick_params(axis='y', colors='#cfcfcf', labelsize=tiny_font, pad=1)
         for spine in ax.spines.values():
             spine.set_color('#4a4a4a')
-        
-        # Remove tooltips/hover functionality
-        
+        self.graph_bars = list(ax.bar(range(self.GRAPH_MAX_BARS), [0] * self.GRAPH_MAX_BARS, width=0.8))
+        for bar in self.graph_bars:
+            bar.set_visible(False)
+        self.graph_growing_bar = ax.bar(0, 0, color='grey', width=0.8, alpha=0.7, animated=True)[0]
+        self.graph_empty_text = ax.text(0.5, 0.5, 'No graph data yet', transform=ax.transAxes, ha='center', va='center', color='#bfbfbf')
+        self.graph_background = None
+        self.graph_y_max = None
+        self.canvas.mpl_connect('draw_event', self.on_graph_draw)
+        self.canvas.mpl_connect('resize_event', lambda _event: self.style_graph())
+
+    def style_graph(self):
+        # Margins follow the canvas size and fonts the window height; both can change between draws.
+        ax = self.graph_axes
+        self.apply_fixed_graph_margins(ax)
+        ax.yaxis.label.set_fontsize(self.graph_label_font)
+        ax.yaxis.labelpad = 2
+        self.graph_empty_text.set_fontsize(self.graph_label_font)
+        ax.tick_params(axis='x', colors='#cfcfcf', labelsize=self.graph_tick_font, pad=1)
+        ax.tick_params(axis='y', colors='#cfcfcf', labelsize=self.graph_tick_font, pad=1)
+
+    @staticmethod
+    def graph_y_limit(longest):
+        # Rounded up to whole 10 s steps, so a growing bar rescales the axis every 10 s, not every tick.
+        return max(30, math.ceil(longest / 10) * 10)
+
+    def plot_graph(self):
+        if getattr(self, 'graph_axes', None) is None:
+            self.build_graph()
+        ax = self.graph_axes
+        self.style_graph()
+        growing = self.current_bar_start is not None
+        if not self.click_history and not growing:
+            for bar in self.graph_bars:
+                bar.set_visible(False)
+            self.graph_growing_bar.set_visible(False)
+            self.graph_empty_text.set_visible(True)
+            ax.set_xlim(0, 10)
+            self.graph_y_max = 30
+            ax.set_ylim(0, self.graph_y_max)
+            self.canvas.draw()
+            return
+        self.graph_empty_text.set_visible(False)
+
+        colors = {'enable_tx': 'green', 'cq': 'yellow', 'band_change': 'orange', 'stop': 'red'}
+
+        # Show completed bars (last 100, or less initially)
+        max_bars = min(self.GRAPH_MAX_BARS, max(10, len(self.click_history) + (1 if growing else 0)))
+        start_index = max(0, len(self.click_history) - (max_bars - (1 if growing else 0)))
+        shown = self.click_history[start_index:]
+        for i, bar in enumerate(self.graph_bars):
+            if i < len(shown):
+                _start_time, _end_time, event_type, duration = shown[i]
+                bar.set_height(duration)
+                bar.set_color(colors.get(event_type, 'blue'))
+                bar.set_visible(True)
+            else:
+                bar.set_visible(False)
+        longest = max([duration for _, _, _, duration in shown] + [0])
+
+        # Current growing bar (grey), drawn by on_graph_draw and update_growing_bar
+        self.graph_growing_bar.set_visible(growing)
+        if growing:
+            current_duration = (datetime.now() - self.current_bar_start).total_seconds()
+            self.graph_growing_bar.set_x(len(shown) - 0.4)
+            self.graph_growing_bar.set_height(current_duration)
+            longest = max(longest, current_duration)
+
+        # X auto-scales from 10 to 100 bars, Y from an initial 30 s
+        ax.set_xlim(-0.5, max_bars - 0.5)
+        self.graph_y_max = self.graph_y_limit(longest)
+        ax.set_ylim(0, self.graph_y_max)
         self.canvas.draw()
 
+    def on_graph_draw(self, _event):
+        # Every full draw leaves the axes without the animated bar; keep that as the blit background.
+        self.graph_background = self.canvas.copy_from_bbox(self.graph_axes.bbox)
+        if self.graph_growing_bar.get_visible():
+            self.graph_axes.draw_artist(self.graph_growing_bar)
+
     def apply_fixed_graph_margins(self, ax):
         # Keep constant pixel margins so whitespace does not grow with frame size.
         left_px = 48
@@ -1315,20 +1477,191 @@ class FT8Clicker(QMainWindow):
 
     def update_growing_bar(self):
         """Update the growing bar in real-time"""
-        if hasattr(self, 'current_bar_start') and self.current_bar_start is not None:
+        if self.current_bar_start is None or getattr(self, 'graph_axes', None) is None:
+            return
+        current_duration = (datetime.now() - self.current_bar_start).total_seconds()
+        if self.graph_background is None or self.graph_y_limit(current_duration) > self.graph_y_max:
             self.plot_graph()
-
-    def log(self, message):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.log_text.append(f"[{timestamp}] {message}")
+            return
+        # Only the growing bar changed: repaint it over the cached axes and blit that region.
+        self.graph_growing_bar.set_height(current_duration)
+        self.canvas.restore_region(self.graph_background)
+        self.graph_axes.draw_artist(self.graph_growing_bar)
+        self.canvas.blit(self.graph_axes.bbox)
+
+    def log(self, message, key=None, **fields):
+        """
+        Safe from any thread: the message is queued and flush_log shows it on
+        the GUI thread. `message` may be a LazyMessage, formatted only if the
+        record is kept. Messages with a `key` are rate limited per key.
+        `fields` (event, button, color, state, band) only go to the JSONL
+        event log and the event store, and only for live sessions.
+        """
+        if key is not None:
+            show, repeats = self.log_limiter.allow(key, message)
+            if not show:
+                # Structured events are still counted; only the text is dropped.
+                self.record_event(time.time(), fields)
+                return
+            if repeats:
+                message = repeated_message(message, repeats)
+        record = self.log_buffer.append(message, fields)
+        # Replayed clicks aren't real ones; keep them out of events.jsonl. A failed
+        # open is reported from EventLog's thread, maybe before self.event_log is set.
+        if not self.replaying and hasattr(self, 'event_log'):
+            self.event_log.write(record)
+        self.record_event(record[0], fields)
+
+    def record_event(self, created, fields):
+        if 'event' in fields and not self.replaying:
+            event = dict(fields)
+            self.event_store.record(event.pop('event'), created, **event)
+
+    def flush_log(self):
+        for message, count in self.log_limiter.sweep():
+            self.log(repeated_message(message, count))
+        lines = self.log_buffer.take_pending()
+        if lines:
+            self.log_text.appendPlainText("\n".join(lines))
 
     def clear_log(self):
+        self.log_buffer.clear()
         self.log_text.clear()
 
     def export_log(self):
-        with open('log.txt', 'w') as f:
-            f.write(self.log_text.toPlainText())
-        self.log("Log exported to log.txt")
+        # The event log already holds everything, cleared or not; exporting is a copy.
+        try:
+            self.event_log.export('log.jsonl')
+        except OSError as e:
+            self.log(f"Could not export log: {e}")
+            return
+        self.log("Log exported to log.jsonl")
+
+    def toggle_capture_recording(self):
+        if self.replaying:
+            return
+        if self.capture_recorder is not None:
+            recorder = self.capture_recorder
+            self.capture_worker.set_recorder(None)
+            self.capture_recorder = None
+            recorder.close()
+            self.record_btn.setText("Record Capture")
+            self.record_btn.setStyleSheet("")
+            self.log(f"Capture recording saved to {recorder.path} ({recorder.ticks} ticks, {recorder.frames} frames)")
+            return
+        path = f"capture-{datetime.now().strftime('%Y%m%d-%H%M%S')}.ft8rec"
+        try:
+            self.capture_recorder = CaptureRecorder(path)
+        except OSError as e:
+            self.log(f"Could not start capture recording: {e}")
+            return
+        self.capture_worker.set_recorder(self.capture_recorder)
+        self.record_btn.setText("Stop Recording")
+        self.record_btn.setStyleSheet("background-color: red; color: white;")
+        self.log(f"Recording capture to {path}")
+
+    def choose_capture_replay(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Capture Recording", "", "Capture recordings (*.ft8rec)")
+        if path:
+            self.replay_capture(path)
+
+    def replay_capture(self, path):
+        """
+        Feed a recorded session through update_button_colors and the automation
+        loop as fast as possible, on the recording's clock and without clicking.
+        Learned states, counters and click history are restored afterwards.
+        """
+        if self.running:
+            self.log("Stop automation before replaying a capture recording.")
+            return
+        if self.capture_recorder is not None:
+            self.log("Stop the capture recording before replaying one.")
+            return
+        try:
+            replay = CaptureReplay(path)
+        except (OSError, ValueError) as e:
+            self.log(f"Could not open capture recording: {e}")
+            return
+        saved = {
+            'learned_buttons': copy.deepcopy(self.learned_buttons),
+            'click_history': list(self.click_history),
+            'current_bar_start': self.current_bar_start,
+            'last_button_states': dict(self.last_button_states),
+            'last_click_times': dict(self.last_click_times),
+            'current_band': self.current_band,
+            'current_band_index': self.current_band_index,
+        }
+        self.replaying = True
+        self.replay_cache = FrameCache(ttl=0)
+        self.replay_clicks = Counter()
+        self.running = True
+        self.cq_remaining = self.timer_setting_value('cq')
+        self.app_remaining = self.timer_setting_value('app')
+        self.cqs_remaining = self.timer_setting_value('cqs')
+        self.short_qso_count = 0
+        self.last_tx_time = None
+        self.enable_tx_cooldown = False
+        self.log(f"Replaying capture recording {path}")
+        started = time.perf_counter()
+        ticks = 0
+        recorded = 0.0
+        last_second = None
+        cooldown_until = None
+        try:
+            for snapshot in replay:
+                recorded = snapshot.captured_at
+                self.replay_clock = datetime.fromtimestamp(replay.started_at + recorded)
+                # Replayed samples are "just captured" as far as the replay cache is concerned.
+                now = time.monotonic()
+                samples = {b: sample._replace(captured_at=now) for b, sample in snapshot.samples.items()}
+                self.replay_cache.store(samples, {b: data['pos'] for b, data in self.learned_buttons.items()})
+                self.update_button_colors(CaptureSnapshot(now, MappingProxyType(samples)))
+                if cooldown_until is not None and recorded >= cooldown_until:
+                    self.enable_tx_cooldown = False
+                    cooldown_until = None
+                was_cooling = self.enable_tx_cooldown
+                self.clicking_loop()
+                if self.enable_tx_cooldown and not was_cooling:
+                    cooldown_until = recorded + 2
+                # The CQ and auto-stop countdowns tick once per recorded second.
+                second = int(recorded)
+                if last_second is None:
+                    last_second = second
+                while last_second < second and self.running:
+                    last_second += 1
+                    self.auto_cq()
+                    self.auto_stop()
+                ticks += 1
+                if not self.running:
+                    break
+        except Exception as e:
+            self.log(f"Replay stopped: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            clicks = ", ".join(f"{self.display_names.get(b, b)} x{n}" for b, n in self.replay_clicks.items()) or "none"
+            self.cooldown_timer.stop()
+            self.enable_tx_cooldown = False
+            self.running = False
+            self.replaying = False
+            self.replay_clock = None
+            self.replay_cache = None
+            self.learned_buttons = saved['learned_buttons']
+            self.state_classifiers.clear()
+            self.click_history = saved['click_history']
+            self.current_bar_start = saved['current_bar_start']
+            self.last_button_states = saved['last_button_states']
+            self.last_click_times = saved['last_click_times']
+            self.current_band = saved['current_band']
+            self.current_band_index = saved['current_band_index']
+            self.cq_remaining = self.timer_setting_value('cq')
+            self.app_remaining = self.timer_setting_value('app')
+            self.cqs_remaining = self.timer_setting_value('cqs')
+            self.refresh_timer_arc('cq')
+            self.refresh_timer_arc('cqs')
+            self.refresh_timer_arc('app')
+            self.revert_button_colors()
+            self.plot_graph()
+            self.log(f"Replayed {ticks} ticks ({recorded:.0f}s recorded) in {elapsed:.2f}s; automation clicks: {clicks}")
 
     def open_settings(self):
         dialog = QDialog(self)
@@ -1448,6 +1781,7 @@ class FT8Clicker(QMainWindow):
         self.settings['cqs_remaining'] = self.cqs_spin.value()
         self.settings['app_time'] = self.app_spin.value() * 60
         self.refresh_timer_settings_cache()
+        self.update_capture_interval()
         self.visible_bands = [b for b in self.all_bands if self.band_checks[b].isChecked()]
         self.settings['visible_bands'] = self.visible_bands
         self.band_order = [b for b in self.all_bands if b in self.learned_buttons and b in self.visible_bands]
@@ -1470,6 +1804,7 @@ class FT8Clicker(QMainWindow):
             insert_index = len(self.band_buttons)
             self.band_row_layout.insertWidget(insert_index, btn, 1)
             self.band_buttons[band] = btn
+        self.last_button_digests.clear()
 
     def timer_control_info(self, timer_name):
         config = {
@@ -1605,6 +1940,12 @@ class FT8Clicker(QMainWindow):
             self.settings['current_band'] = self.current_band
             self.settings['window_maximized'] = self.isMaximized()
         self.save_settings()
+        self.settings.close()
+        if self.capture_recorder is not None:
+            self.toggle_capture_recording()
+        self.stop_capture_worker()
+        self.event_log.close()
+        self.event_store.close()
         super().closeEvent(event)
 
     def resizeEvent(self, event):
@@ -1691,57 +2032,302 @@ class FT8Clicker(QMainWindow):
 
     def unlearn_all(self):
         self.learned_buttons.clear()
+        self.last_button_digests.clear()
+        self.state_classifiers.clear()
         self.save_settings()
+        self.sync_capture_points()
         self.band_order = [b for b in self.all_bands if b in self.learned_buttons and b in self.visible_bands]
         self.current_band_index = 0
         self.log("Unlearned all buttons")
 
     def revert_button_colors(self):
+        # Styles are reset here, so the next snapshot must repaint every button.
+        self.last_button_digests.clear()
         self.enable_tx_btn.setStyleSheet("")
         self.tx6_btn.setStyleSheet("")
         for band, btn in self.band_buttons.items():
             btn.setStyleSheet("")
 
-    def update_button_colors(self):
+    def setup_capture_worker(self):
+        self.capture_thread = QThread(self)
+        self.capture_worker = CaptureWorker(self.capture_interval_ms())
+        self.capture_worker.moveToThread(self.capture_thread)
+        self.capture_thread.started.connect(self.capture_worker.start)
+        self.capture_thread.finished.connect(self.capture_worker.deleteLater)
+        self.capture_worker.snapshot_ready.connect(self.on_capture_snapshot)
+        self.capture_worker.button_moved.connect(self.on_button_moved)
+        self.capture_worker.window_moved.connect(self.on_window_moved)
+        self.window_locator = None
+        self.window_origin = None
+        if self.settings.get('follow_window', True) and self.synthetic_backend is None:
+            self.window_locator = window_locator(self.settings.get('window_title', DEFAULT_TITLE))
+            self.attach_window_offsets()
+        self.capture_worker.set_window_locator(self.window_locator)
+        self.capture_interval_changed.connect(self.capture_worker.set_interval)
+        self.capture_schedule_changed.connect(self.capture_worker.set_scheduler)
+        self.capture_requested.connect(self.capture_worker.poll)
+        self.sync_capture_points()
+        self.capture_thread.start()
+
+    def stop_capture_worker(self):
+        if not hasattr(self, 'capture_thread') or not self.capture_thread.isRunning():
+            return
+        QMetaObject.invokeMethod(self.capture_worker, "stop", Qt.ConnectionType.BlockingQueuedConnection)
+        self.capture_thread.quit()
+        self.capture_thread.wait(2000)
+
+    def sync_capture_points(self):
+        if not hasattr(self, 'capture_worker'):
+            return
+        templates = {}
+        if self.settings.get('relocate_buttons', True):
+            for button, data in self.learned_buttons.items():
+                template = decode_template(data['template']) if 'template' in data else None
+                if template is not None:
+                    templates[button] = template
+        offsets = {b: data['offset'] for b, data in self.learned_buttons.items() if 'offset' in data}
+        self.capture_worker.set_points({b: data['pos'] for b, data in self.learned_buttons.items()}, templates, offsets)
+
+    def attach_window_offsets(self):
+        # Attach to the window that holds the learned buttons, never just any match:
+        # WSJT-X's Wide Graph and other windows share its title. Buttons learned
+        # before window tracking then take their offset from where it is now.
+        try:
+            geometry = self.find_button_window()
+        except Exception as e:
+            self.log(f"Window tracking unavailable: {e}")
+            self.window_locator = None
+            return
+        if geometry is None:
+            return
+        left, top, width, height = geometry
+        self.window_origin = (left, top)
+        self.settings['window_size'] = [width, height]
+        attached = 0
+        for data in self.learned_buttons.values():
+            x, y = data['pos']
+            if 'offset' not in data and left <= x < left + width and top <= y < top + height:
+                data['offset'] = (x - left, y - top)
+                attached += 1
+        if attached:
+            self.log(f"{attached} learned buttons now follow the FT8 window")
+            self.schedule_settings_save()
+
+    def find_button_window(self):
+        if self.window_locator is None:
+            return None
+        # A saved position whose offset still agrees with the window under it proves the
+        # window has not moved since; otherwise fall back to the window of the saved size.
+        for data in sorted(self.learned_buttons.values(), key=lambda data: 'offset' not in data):
+            x, y = data['pos']
+            geometry = self.window_locator.attach((x, y))
+            if geometry is None:
+                continue
+            if 'offset' not in data or (geometry[0] + data['offset'][0], geometry[1] + data['offset'][1]) == (x, y):
+                return geometry
+        size = self.settings.get('window_size')
+        if size:
+            return self.window_locator.attach(size=tuple(size))
+        return None
+
+    def learn_window_offset(self, button_type, x, y):
+        data = self.learned_buttons[button_type]
+        data.pop('offset', None)
+        if self.window_locator is None:
+            return
+        try:
+            geometry = self.window_locator.attach((x, y))
+        except Exception as e:
+            self.log(f"Warning: Could not query the FT8 window: {e}")
+            return
+        if geometry is not None:
+            left, top = self.window_origin = geometry[:2]
+            data['offset'] = (x - left, y - top)
+            self.settings['window_size'] = list(geometry[2:])
+
+    def on_window_moved(self, left, top):
+        if self.replaying or self.learning:
+            return
+        self.window_origin = (left, top)
+        moved = 0
         for button_type, data in self.learned_buttons.items():
-            pos = data['pos']
-            try:
-                current_color, colors = get_pixel_color(pos[0], pos[1])
-            except KeyboardInterrupt:
-                # Allow Ctrl+C from terminal to stop the app without traceback noise.
-                QApplication.quit()
-                return
-            except Exception as e:
-                self.log(f"Warning: Could not get pixel color for {button_type}: {e}, using default")
-                current_color, colors = None, []
+            if 'offset' not in data:
+                continue
+            dx, dy = data['offset']
+            if tuple(data['pos']) != (left + dx, top + dy):
+                data['pos'] = (left + dx, top + dy)
+                self.last_button_digests.pop(button_type, None)
+                moved += 1
+        if moved:
+            self.log(f"FT8 window moved to {left},{top}; {moved} button positions follow it")
+            self.sync_capture_points()
+            self.schedule_settings_save()
+
+    def on_button_moved(self, button_type, x, y):
+        # The worker found this button's template away from its learned position.
+        if self.replaying or self.learning or button_type not in self.learned_buttons:
+            return
+        data = self.learned_buttons[button_type]
+        old_x, old_y = data['pos']
+        data['pos'] = (x, y)
+        if 'offset' in data and self.window_origin is not None:
+            data['offset'] = (x - self.window_origin[0], y - self.window_origin[1])
+        self.last_button_digests.pop(button_type, None)
+        self.log(
+            f"`{self.display_names.get(button_type, button_type)}` moved from {old_x},{old_y} to {x},{y}; "
+            f"learned position updated"
+        )
+        self.sync_capture_points()
+        self.schedule_settings_save()
+
+    def capture_interval_ms(self):
+        # Poll at least as often as the click loop while running so it never acts on stale state.
+        if getattr(self, 'running', False):
+            return max(100, min(1000, int(self.click_interval * 1000)))
+        return 1000
+
+    def update_capture_interval(self):
+        self.capture_interval_changed.emit(self.capture_interval_ms())
+        # While automating, poll fast only around FT8 slot edges, where Enable Tx
+        # and Tx 6 actually change, and back off mid-slot.
+        if getattr(self, 'running', False) and self.settings.get('slot_polling', True):
+            self.slot_scheduler = SlotPollScheduler(
+                fast_interval=float(self.settings.get('slot_fast_interval', 0.1)),
+                slow_interval=float(self.settings.get('slot_slow_interval', 3.0)),
+                edge_window=float(self.settings.get('slot_edge_window', 1.5)),
+                clock=self.slot_clock.now,
+            )
+        else:
+            self.slot_scheduler = None
+        self.capture_schedule_changed.emit(self.slot_scheduler)
+
+    def capture_max_gap(self):
+        # Longest expected wait between two worker polls, in seconds.
+        if self.slot_scheduler is not None:
+            return self.slot_scheduler.slow_interval
+        return self.capture_interval_ms() / 1000
+
+    def log_capture_rate(self):
+        scheduler = self.slot_scheduler
+        if scheduler is None:
+            return
+        flat_rate = 1000 / max(100, min(1000, int(self.click_interval * 1000)))
+        self.log(
+            f"Capture rate: {scheduler.capture_rate():.2f} polls/s "
+            f"(slot-aware schedule expects {scheduler.expected_rate():.2f}, "
+            f"flat polling would be {flat_rate:.2f})"
+        )
+
+    def on_capture_snapshot(self, snapshot):
+        if self.replaying:
+            return
+        try:
+            self.update_button_colors(snapshot)
+        except KeyboardInterrupt:
+            # Allow Ctrl+C from terminal to stop the app without traceback noise.
+            QApplication.quit()
+
+    def snapshot_state(self, button_type):
+        # Automation decisions read the shared frame cache the worker fills (the
+        # replay's own cache during a replay). A
+        # sample older than one missed tick, or taken before our own last click
+        # on that button, no longer reflects the screen: ask for a fresh capture.
+        if button_type not in self.learned_buttons:
+            return 'unknown'
+        data = self.learned_buttons[button_type]
+        max_age = 2 * self.capture_max_gap()
+        cache = self.replay_cache if self.replaying else frame_cache()
+        sample = cache.lookup(button_type, data['pos'], max_age, self.last_click_times.get(button_type, 0))
+        if sample is None or sample.color is None:
+            self.capture_requested.emit()
+            return 'unknown'
+        state, confidence = self.read_button_state(button_type, sample.color, sample.colors)
+        if state is None or confidence < self.classifier_min_confidence():
+            # An ambiguous read (a fade or a half-drawn button) is re-sampled, never clicked on.
+            self.capture_requested.emit()
+            return 'unknown'
+        return state
+
+    def state_classifier(self, button_type):
+        classifier = self.state_classifiers.get(button_type)
+        if classifier is None:
+            classifier = StateClassifier(self.learned_buttons[button_type]['states'])
+            self.state_classifiers[button_type] = classifier
+        return classifier
+
+    def classifier_min_confidence(self):
+        return float(self.settings.get('classifier_min_confidence', MIN_CONFIDENCE))
+
+    def read_button_state(self, button_type, color, colors):
+        # A learned shade is authoritative; anything else goes to the ROI histogram classifier.
+        state = self.learned_buttons[button_type]['states'].get(color, None)
+        if state is not None:
+            return state, 1.0
+        return self.state_classifier(button_type).classify(colors)
+
+    def update_button_colors(self, snapshot):
+        for button_type, data in self.learned_buttons.items():
+            sample = snapshot.samples.get(button_type)
+            current_color, colors = (sample.color, sample.colors) if sample else (None, [])
+            # An unchanged ROI was already classified and rendered on an earlier tick.
+            digest = sample.digest if sample else None
+            if digest is not None and self.last_button_digests.get(button_type) == digest:
+                # Still count the shade as seen: eviction ranks by hits, and a steady
+                # shade must not lose to flickering anti-aliasing ones.
+                if current_color:
+                    data['states'].touch(current_color)
+                continue
+            self.last_button_digests[button_type] = digest
+            unsure = self.unsure_shades.pop(button_type, None)
             if current_color:
                 states = data['states']
-                color_key = str(current_color)
                 if len(states) <= 1:
                     current_state = "inactive"
-                    if color_key not in states:
-                        states[color_key] = current_state
-                        self.log(
-                            f"Learned new state for {button_type}: {state_display(current_state)} with color "
-                            f"`{get_color_name(*current_color)}` {current_color}, sampled: {format_color_samples(colors)}"
-                        )
-                        self.save_settings()
+                    if current_color in states:
+                        states.touch(current_color)
+                        changed = False
+                    else:
+                        changed = states.learn(current_color, current_state)
                 else:
-                    detected_state = self.classify_button_state(current_color)
-                    if color_key not in states or states.get(color_key) != detected_state:
-                        states[color_key] = detected_state
-                        self.log(
-                            f"Learned new state for {button_type}: {state_display(detected_state)} with color "
-                            f"`{get_color_name(*current_color)}` {current_color}, sampled: {format_color_samples(colors)}"
-                        )
-                        self.save_settings()
-                    current_state = detected_state
+                    current_state = states.get(current_color, None)
+                    if current_state is not None:
+                        states.touch(current_color)
+                        changed = False
+                    else:
+                        current_state, confidence = self.state_classifier(button_type).classify(colors)
+                        if current_state is not None and confidence >= self.classifier_min_confidence():
+                            changed = states.learn(current_color, current_state)
+                        else:
+                            # Too ambiguous to learn at once: the palette guess is only displayed
+                            # and snapshot_state re-samples instead of clicking. A fade is gone by
+                            # the next sample; a shade that stays put is a new look of the button,
+                            # so after unknown_shade_samples samples its palette guess is learned.
+                            current_state = self.classify_button_state(current_color)
+                            count = unsure[1] + 1 if unsure is not None and unsure[0] == digest else 1
+                            if count >= int(self.settings.get('unknown_shade_samples', 3)):
+                                changed = states.learn(current_color, current_state)
+                            else:
+                                self.unsure_shades[button_type] = (digest, count)
+                                # Classify the unchanged ROI again rather than skipping it.
+                                self.last_button_digests.pop(button_type, None)
+                                changed = False
+                if changed:
+                    self.log(
+                        LazyMessage(learned_state_message, button_type, current_state, current_color, colors),
+                        key=('learned', button_type), event='learned', button=button_type,
+                        color=current_color, state=current_state, band=self.current_band,
+                    )
+                    self.schedule_settings_save()
                 last_state = self.last_button_states.get(button_type)
                 if current_state != last_state:
                     self.last_button_states[button_type] = current_state
                     display_name = self.display_names.get(button_type, button_type)
                     if current_state in ("active", "inactive"):
-                        self.log(f"Button {display_name} detected {state_display(current_state)}")
+                        self.log(
+                            LazyMessage("Button {} detected {}".format, display_name, state_display(current_state)),
+                            event='state', button=button_type, color=current_color, state=current_state,
+                            band=self.current_band,
+                        )
             # Set UI button color to match detected color
             if not (self.learning and button_type == self.button_to_learn):
                 if current_color:
@@ -1756,12 +2342,19 @@ class FT8Clicker(QMainWindow):
                 elif button_type in self.band_buttons:
                     self.band_buttons[button_type].setStyleSheet(color_style)
 
+    def schedule_settings_save(self):
+        # Learned shades and moved positions are written in one batch rather than on every change.
+        if self.replaying:
+            return
+        if not hasattr(self, 'states_save_timer'):
+            self.states_save_timer = QTimer(self)
+            self.states_save_timer.setSingleShot(True)
+            self.states_save_timer.timeout.connect(self.save_settings)
+        if not self.states_save_timer.isActive():
+            self.states_save_timer.start(30000)
+
     def classify_button_state(self, color):
-        r, g, b = color
-        name = get_color_name(r, g, b)
-        if name in ("white", "gray", "silver", "black"):
-            return "inactive"
-        return "active"
+        return palette_state(color)
 
     def flash_button(self, button):
         if button in self.flash_restore_styles:
@@ -1781,11 +2374,105 @@ class FT8Clicker(QMainWindow):
         self.cq_timer.timeout.connect(self.auto_cq)
         self.app_timer = QTimer()
         self.app_timer.timeout.connect(self.auto_stop)
-        self.color_timer = QTimer()
-        self.color_timer.timeout.connect(self.update_button_colors)
         self.graph_timer = QTimer()
         self.graph_timer.timeout.connect(self.update_growing_bar)
 
+    def watch_screen_configuration(self):
+        # Capture backends cache the monitor layout; drop it whenever screens change.
+        app = QGuiApplication.instance()
+        if not app:
+            return
+        app.screenAdded.connect(self.on_screen_added)
+        app.screenRemoved.connect(lambda _screen: capture_backends().invalidate())
+        app.primaryScreenChanged.connect(lambda _screen: capture_backends().invalidate())
+        for screen in app.screens():
+            screen.geometryChanged.connect(lambda _rect: capture_backends().invalidate())
+
+    def watch_settings_file(self):
+        # Settings pushed to the file by other tools are picked up without a restart.
+        path = os.path.abspath(self.settings_file)
+        self.settings_watcher = QFileSystemWatcher(self)
+        self.settings_watcher.addPath(os.path.dirname(path))
+        if os.path.exists(path):
+            self.settings_watcher.addPath(path)
+        # Atomic replaces drop the watched file and arrive as several events; settle first.
+        self.settings_reload_timer = QTimer(self)
+        self.settings_reload_timer.setSingleShot(True)
+        self.settings_reload_timer.setInterval(500)
+        self.settings_reload_timer.timeout.connect(self.reload_settings_file)
+        self.settings_watcher.fileChanged.connect(lambda _path: self.settings_reload_timer.start())
+        self.settings_watcher.directoryChanged.connect(lambda _path: self.settings_reload_timer.start())
+        self.settings_file_changed.connect(self.apply_settings_file)
+
+    def reload_settings_file(self):
+        path = os.path.abspath(self.settings_file)
+        if os.path.exists(path) and path not in self.settings_watcher.files():
+            self.settings_watcher.addPath(path)
+        threading.Thread(target=self.read_settings_file, name="settings-reload", daemon=True).start()
+
+    def read_settings_file(self):
+        # Reading, parsing and diffing run here; only the changed keys reach the GUI thread.
+        try:
+            external = self.settings.read_external()
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.log(f"Could not reload settings: {e}")
+            return
+        if external is not None:
+            self.settings_file_changed.emit(external)
+
+    def apply_settings_file(self, external):
+        if self.replaying or self.learning:
+            # Try again once the replay or LEARN is over.
+            self.settings_reload_timer.start()
+            return
+        changed = self.settings.apply(external)
+        if not changed:
+            return
+        if 'learned_buttons' in changed:
+            self.learned_buttons = {
+                button: {**data, 'states': self.new_button_states(data.get('states'))}
+                for button, data in self.settings.get('learned_buttons', {}).items()
+            }
+            if self.window_origin is not None:
+                left, top = self.window_origin
+                for data in self.learned_buttons.values():
+                    if 'offset' in data:
+                        dx, dy = data['offset']
+                        data['pos'] = (left + dx, top + dy)
+            self.saved_learned_buttons = self.learned_buttons_signature()
+            self.state_classifiers.clear()
+            self.last_button_digests.clear()
+            self.sync_capture_points()
+        if 'visible_bands' in changed:
+            self.visible_bands = self.settings.get('visible_bands', ['40m', '20m', '17m', '15m', '12m', '10m'])
+        if {'learned_buttons', 'visible_bands'} & changed:
+            self.band_order = [b for b in self.all_bands if b in self.learned_buttons and b in self.visible_bands]
+            self.current_band_index = self.band_order.index(self.current_band) if self.current_band in self.band_order else 0
+            self.update_ui_bands()
+        if {'cq_time', 'cqs_remaining', 'app_time'} & changed:
+            # New maxima only; the running countdowns keep their values.
+            self.refresh_timer_settings_cache()
+            for timer_name in ('cq', 'cqs', 'app'):
+                self.refresh_timer_arc(timer_name)
+        if 'click_interval' in changed:
+            self.click_interval = self.settings.get('click_interval', 0.5)
+            if self.running and hasattr(self, 'click_timer'):
+                # Restarting applies the new period now rather than after Stop/Start.
+                self.click_timer.start(int(self.click_interval * 1000))
+        if changed & {'click_interval', 'slot_polling', 'slot_fast_interval', 'slot_slow_interval', 'slot_edge_window'}:
+            self.update_capture_interval()
+        if 'settings_write_interval' in changed:
+            self.settings.writer.interval = float(self.settings.get('settings_write_interval', 2.0))
+        # Queued writes may still hold the old values of these keys; supersede them.
+        self.settings.save()
+        self.log(f"Settings reloaded from {self.settings_file}: {', '.join(sorted(changed))}")
+
+    def on_screen_added(self, screen):
+        capture_backends().invalidate()
+        screen.geometryChanged.connect(lambda _rect: capture_backends().invalidate())
+
     def check_screen_recording_permission(self):
         if sys.platform != "darwin":
             return
@@ -1810,6 +2497,10 @@ class FT8Clicker(QMainWindow):
 if __name__ == "__main__":
     # Keep default Ctrl+C behavior available when launched from a terminal.
     signal.signal(signal.SIGINT, signal.default_int_handler)
+    # --synthetic: capture from an in-memory framebuffer, e.g. for benchmarks on a headless CI box.
+    synthetic = "--synthetic" in sys.argv[1:]
+    if synthetic:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
     app = QApplication(sys.argv)
     startup_dialog = QProgressDialog("Starting FT8Clicker...", "", 0, 4)
     startup_dialog.setWindowTitle("Loading")
@@ -1825,7 +2516,7 @@ if __name__ == "__main__":
         startup_dialog.setValue(step)
         app.processEvents()
 
-    window = FT8Clicker(startup_progress=startup_progress)
+    window = FT8Clicker(startup_progress=startup_progress, synthetic=synthetic)
     startup_dialog.setValue(4)
     startup_dialog.close()
     if getattr(window, 'start_maximized', False):
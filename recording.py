@@ -0,0 +1,133 @@
+import struct
+import threading
+import time
+import zlib
+from types import MappingProxyType
+
+import numpy as np
+
+from capture import ButtonSample, CaptureSnapshot, analyze_roi, sample_digest
+
+# File layout: MAGIC, a header with the wall-clock start time, then records.
+#   b"B" <HiiH> button id, x, y, name length, then the UTF-8 name
+#   b"T" <d>    tick, seconds since the start of the recording
+#   b"F" <HHI>  button id, pixel count, payload length, then the payload:
+#               zlib-compressed little-endian uint32 0xRRGGBB pixels, scan order
+# A button's frame is only written when its ROI changed; on every other tick
+# it repeats the last frame written for it.
+MAGIC = b"FT8REC\x01\n"
+HEADER = struct.Struct("<d")
+BUTTON = struct.Struct("<HiiH")
+TICK = struct.Struct("<d")
+FRAME = struct.Struct("<HHI")
+
+def packed_pixels(colors):
+    packed = getattr(colors, "packed", None)
+    if packed is not None:
+        return packed.astype("<u4", copy=False)
+    return np.array([(r << 16) | (g << 8) | b for r, g, b in colors], dtype="<u4")
+
+
+class CaptureRecorder:
+    """
+    Writes every capture tick to a compact binary file for later replay.
+    Unchanged ROIs (same digest as the last frame written for that button)
+    cost nothing but the tick marker.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.file.write(HEADER.pack(time.time()))
+        self.started = time.monotonic()
+        self.button_ids = {}
+        self.last_digests = {}
+        self.ticks = 0
+        self.frames = 0
+
+    def record(self, snapshot, positions=None):
+        positions = positions or {}
+        with self.lock:
+            if self.file is None:
+                return
+            write = self.file.write
+            write(b"T" + TICK.pack(snapshot.captured_at - self.started))
+            self.ticks += 1
+            for button, sample in snapshot.samples.items():
+                button_id = self.button_ids.get(button)
+                if button_id is None:
+                    button_id = len(self.button_ids)
+                    self.button_ids[button] = button_id
+                    name = str(button).encode("utf-8")
+                    x, y = positions.get(button, (0, 0))
+                    write(b"B" + BUTTON.pack(button_id, int(x), int(y), len(name)) + name)
+                if sample.digest is not None and self.last_digests.get(button) == sample.digest:
+                    continue
+                self.last_digests[button] = sample.digest
+                pixels = packed_pixels(sample.colors)
+                payload = zlib.compress(pixels.tobytes())
+                write(b"F" + FRAME.pack(button_id, pixels.size, len(payload)) + payload)
+                self.frames += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class CaptureReplay:
+    """
+    Reads a recording back as CaptureSnapshots, one per recorded tick, as
+    fast as the file can be decoded. captured_at is the recorded offset in
+    seconds. Samples are keyed by button name; the replay reads them at the
+    buttons' current learned positions, so recorded positions are skipped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a capture recording")
+            (self.started_at,) = HEADER.unpack(f.read(HEADER.size))
+            self.data = f.read()
+
+    def __iter__(self):
+        data = self.data
+        offset = 0
+        names = {}
+        current = {}
+        tick = None
+        while offset < len(data):
+            kind = data[offset:offset + 1]
+            offset += 1
+            if kind == b"T":
+                if tick is not None:
+                    yield self.snapshot(tick, current)
+                (tick,) = TICK.unpack_from(data, offset)
+                offset += TICK.size
+            elif kind == b"B":
+                button_id, _x, _y, name_len = BUTTON.unpack_from(data, offset)
+                offset += BUTTON.size
+                names[button_id] = data[offset:offset + name_len].decode("utf-8")
+                offset += name_len
+            elif kind == b"F":
+                button_id, count, length = FRAME.unpack_from(data, offset)
+                offset += FRAME.size
+                pixels = np.frombuffer(zlib.decompress(data[offset:offset + length]), dtype="<u4", count=count)
+                offset += length
+                current[names[button_id]] = analyze_roi(pixels)
+            else:
+                raise ValueError(f"Corrupt capture recording at byte {offset - 1}")
+        if tick is not None:
+            yield self.snapshot(tick, current)
+
+    @staticmethod
+    def snapshot(tick, current):
+        samples = {
+            button: ButtonSample(button, color, colors, tick, sample_digest(colors))
+            for button, (color, colors) in current.items()
+        }
+        return CaptureSnapshot(tick, MappingProxyType(samples))
@@ -0,0 +1,214 @@
+import base64
+import time
+
+import numpy as np
+
+from capture import bgra_roi, capture_backends
+
+# Templates are (2 * TEMPLATE_RADIUS + 1)-pixel grayscale squares centered on the learned point.
+TEMPLATE_RADIUS = 12
+# The learned position still shows its button while the template scores at least this.
+MATCH_THRESHOLD = 0.6
+# A position elsewhere is only accepted above this, and only if it beats every
+# other peak within NEAR_RADIUS by RELOCATE_MARGIN, so a neighboring look-alike
+# button (Tx 5 next to Tx 6, another band) does not win.
+RELOCATE_THRESHOLD = 0.95
+RELOCATE_MARGIN = 0.05
+# Failed checks in a row before a search starts: an active state drawn with
+# inverted contrast, or a dialog over the button, only hides it for a while.
+MISSES_BEFORE_SEARCH = 3
+NEAR_RADIUS = 64
+TILE_SIZE = 256
+# Windows flatter than this (gray-level standard deviation) cannot be matched.
+MIN_STDDEV = 2.0
+
+def frame_gray(frame):
+    pixels = bgra_roi(frame.raw, frame.stride, 0, 0, frame.width, frame.height).reshape(frame.height, frame.width)
+    r = ((pixels >> 16) & 0xFF).astype(np.float32)
+    g = ((pixels >> 8) & 0xFF).astype(np.float32)
+    b = (pixels & 0xFF).astype(np.float32)
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+def grab_gray(left, top, width, height):
+    # (gray image, left, top) of the on-screen part of the region, or None.
+    grabbed = capture_backends().grab(left, top, width, height)
+    if grabbed is None:
+        return None
+    frame, g_left, g_top = grabbed
+    return frame_gray(frame), g_left, g_top
+
+def capture_template(x, y, radius=TEMPLATE_RADIUS):
+    size = 2 * radius + 1
+    grabbed = grab_gray(x - radius, y - radius, size, size)
+    if grabbed is None or grabbed[0].shape != (size, size):
+        return None
+    # A flat patch can never be matched (ncc_map gives up on it); keep no template.
+    if grabbed[0].std() < MIN_STDDEV:
+        return None
+    return np.clip(np.rint(grabbed[0]), 0, 255).astype(np.uint8)
+
+def encode_template(patch):
+    height, width = patch.shape
+    return {'width': width, 'height': height, 'gray': base64.b64encode(patch.tobytes()).decode('ascii')}
+
+def decode_template(data):
+    try:
+        patch = np.frombuffer(base64.b64decode(data['gray']), dtype=np.uint8)
+        patch = patch.reshape(int(data['height']), int(data['width']))
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Flat templates saved by earlier versions would only trigger fruitless searches.
+    return patch if patch.std() >= MIN_STDDEV else None
+
+def ncc_map(image, template):
+    """
+    Normalized cross-correlation of the template at every position where it
+    fits inside the image; entry [i, j] scores the window whose top-left
+    corner is (j, i). The correlation runs through an FFT and the window
+    statistics through summed-area tables, so cost grows with image size,
+    not with image size times template size.
+    """
+    image = np.asarray(image, dtype=np.float64)
+    template = np.asarray(template, dtype=np.float64)
+    t_height, t_width = template.shape
+    height, width = image.shape
+    if height < t_height or width < t_width:
+        return None
+    template = template - template.mean()
+    t_norm = np.sqrt((template * template).sum())
+    if t_norm == 0:
+        return None
+    shape = (height + t_height - 1, width + t_width - 1)
+    flipped = np.fft.rfft2(template[::-1, ::-1], shape)
+    corr = np.fft.irfft2(np.fft.rfft2(image, shape) * flipped, shape)[t_height - 1:height, t_width - 1:width]
+
+    def window_sums(values):
+        table = np.pad(values.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+        return table[t_height:, t_width:] - table[:-t_height, t_width:] - table[t_height:, :-t_width] + table[:-t_height, :-t_width]
+
+    count = t_height * t_width
+    sums = window_sums(image)
+    variance = np.maximum(window_sums(image * image) - sums * sums / count, 0.0)
+    flat = variance < count * MIN_STDDEV * MIN_STDDEV
+    scores = corr / (np.sqrt(np.where(flat, 1.0, variance)) * t_norm)
+    scores[flat] = 0.0
+    return scores
+
+
+class ButtonRelocator:
+    """
+    Keeps learned buttons where their LEARN-time templates say they are.
+    check() scores each template at its learned position; after
+    MISSES_BEFORE_SEARCH checks in a row without a match it searches outward
+    from the old position, the neighborhood first and then screen tiles by
+    distance, within a time budget per call. An unfinished search resumes on
+    the next call. A match on, or more like, another learned button is skipped.
+    """
+
+    def __init__(self, budget=0.05):
+        self.budget = budget
+        self.misses = {}  # button -> failed checks in a row
+        self.searches = {}  # button -> (position searched from, remaining regions)
+
+    @staticmethod
+    def score_at(pos, template):
+        t_height, t_width = template.shape
+        x, y = pos
+        grabbed = grab_gray(x - t_width // 2, y - t_height // 2, t_width, t_height)
+        if grabbed is None:
+            return 0.0
+        scores = ncc_map(grabbed[0], template)
+        return float(scores.max()) if scores is not None and scores.size else 0.0
+
+    @staticmethod
+    def search_regions(pos, template):
+        t_height, t_width = template.shape
+        x, y = pos
+        regions = [(x - NEAR_RADIUS - t_width // 2, y - NEAR_RADIUS - t_height // 2,
+                    2 * NEAR_RADIUS + t_width, 2 * NEAR_RADIUS + t_height)]
+        v_left, v_top, v_right, v_bottom, _virtual = capture_backends().backends[0].monitor_bounds()[0]
+        tiles = []
+        for top in range(v_top, v_bottom, TILE_SIZE):
+            for left in range(v_left, v_right, TILE_SIZE):
+                # Tiles overlap by a template so no position falls between two of them.
+                center = (left + TILE_SIZE // 2, top + TILE_SIZE // 2)
+                distance = (center[0] - x) ** 2 + (center[1] - y) ** 2
+                tiles.append((distance, (left, top, TILE_SIZE + t_width, TILE_SIZE + t_height)))
+        tiles.sort()
+        return regions + [region for _, region in tiles]
+
+    def check(self, templates, points):
+        """Returns {button: (x, y)} for every button found at a new position."""
+        deadline = time.monotonic() + self.budget
+        moved = {}
+        for button, template in templates.items():
+            pos = points.get(button)
+            if pos is None or time.monotonic() > deadline:
+                continue
+            if self.score_at(pos, template) >= MATCH_THRESHOLD:
+                self.misses.pop(button, None)
+                self.searches.pop(button, None)
+                continue
+            self.misses[button] = self.misses.get(button, 0) + 1
+            if self.misses[button] < MISSES_BEFORE_SEARCH:
+                continue
+            search = self.searches.get(button)
+            if search is None or search[0] != pos:
+                search = (pos, self.search_regions(pos, template))
+                self.searches[button] = search
+            others = [(points[other], templates[other]) for other in templates
+                      if other != button and points.get(other) is not None]
+            found = self.search(search[1], template, others, deadline)
+            if found is not None:
+                moved[button] = found
+                self.misses.pop(button, None)
+            if found is not None or not search[1]:
+                self.searches.pop(button, None)
+        return moved
+
+    def search(self, regions, template, others, deadline):
+        t_height, t_width = template.shape
+        while regions and time.monotonic() < deadline:
+            grabbed = grab_gray(*regions.pop(0))
+            if grabbed is None:
+                continue
+            image, left, top = grabbed
+            scores = ncc_map(image, template)
+            if scores is None or not scores.size:
+                continue
+            row, col = np.unravel_index(int(scores.argmax()), scores.shape)
+            best = float(scores[row, col])
+            if best < RELOCATE_THRESHOLD:
+                continue
+            found = left + int(col) + t_width // 2, top + int(row) + t_height // 2
+            if self.runner_up(found, template) > best - RELOCATE_MARGIN or self.is_other_button(found, best, others):
+                continue
+            return found
+        return None
+
+    @staticmethod
+    def runner_up(found, template):
+        # Best score within NEAR_RADIUS of `found`, at least a template away from it.
+        t_height, t_width = template.shape
+        x, y = found
+        grabbed = grab_gray(x - NEAR_RADIUS - t_width // 2, y - NEAR_RADIUS - t_height // 2,
+                            2 * NEAR_RADIUS + t_width, 2 * NEAR_RADIUS + t_height)
+        if grabbed is None:
+            return 0.0
+        image, left, top = grabbed
+        scores = ncc_map(image, template)
+        if scores is None or not scores.size:
+            return 0.0
+        row, col = y - t_height // 2 - top, x - t_width // 2 - left
+        scores[max(0, row - t_height + 1):row + t_height, max(0, col - t_width + 1):col + t_width] = -1.0
+        return float(scores.max())
+
+    def is_other_button(self, found, score, others):
+        # The match sits on another learned button, or that button's template fits it better.
+        x, y = found
+        for (other_x, other_y), other in others:
+            if abs(other_x - x) <= other.shape[1] // 2 and abs(other_y - y) <= other.shape[0] // 2:
+                return True
+            if self.score_at(found, other) >= score:
+                return True
+        return False
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+
+# FT8 transmit/receive periods start every 15 s on the UTC clock.
+SLOT_SECONDS = 15.0
+
+def slot_phase(now=None):
+    # Seconds since the start of the current FT8 slot.
+    if now is None:
+        now = time.time()
+    return now % SLOT_SECONDS
+
+
+class SlotClock:
+    """
+    UTC seconds derived from the monotonic clock, so NTP steps or manual clock
+    changes while running cannot make a queued click fire twice or never.
+    `offset` corrects a system clock known to be off from true UTC.
+    """
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.resync()
+
+    def resync(self):
+        self.anchor_utc = time.time()
+        self.anchor_monotonic = time.monotonic()
+
+    def now(self):
+        return self.anchor_utc + (time.monotonic() - self.anchor_monotonic) + self.offset
+
+
+class SlotPollScheduler:
+    """
+    Decides how long the capture worker waits before its next poll.
+    Inside edge_window seconds either side of a slot boundary, where Enable Tx
+    and Tx 6 actually change, it polls every fast_interval; mid-slot it backs
+    off to slow_interval, but never sleeps past the start of the next window.
+    """
+
+    def __init__(self, fast_interval=0.1, slow_interval=3.0, edge_window=1.5, clock=time.time):
+        self.fast_interval = fast_interval
+        self.slow_interval = max(fast_interval, slow_interval)
+        self.edge_window = min(edge_window, SLOT_SECONDS / 2)
+        self.clock = clock
+        self.started = time.monotonic()
+        self.polls = deque()
+        self.polls_lock = threading.Lock()
+
+    def in_edge_window(self, now=None):
+        phase = slot_phase(self.clock() if now is None else now)
+        return phase < self.edge_window or phase >= SLOT_SECONDS - self.edge_window
+
+    def next_delay(self, now=None):
+        if now is None:
+            now = self.clock()
+        if self.in_edge_window(now):
+            return self.fast_interval
+        until_window = SLOT_SECONDS - self.edge_window - slot_phase(now)
+        return max(self.fast_interval, min(self.slow_interval, until_window))
+
+    def expected_rate(self):
+        # Average polls per second over a whole slot.
+        edge = 2 * self.edge_window
+        return (edge / self.fast_interval + (SLOT_SECONDS - edge) / self.slow_interval) / SLOT_SECONDS
+
+    def record_poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.polls_lock:
+            self.polls.append(now)
+            while now - self.polls[0] > 60.0:
+                self.polls.popleft()
+
+    def capture_rate(self, now=None):
+        # Measured polls per second over the last minute.
+        now = time.monotonic() if now is None else now
+        with self.polls_lock:
+            span = now - max(self.started, now - 60.0)
+            return len(self.polls) / span if span > 0 else 0.0
+
+
+class ClickDispatcher:
+    """
+    Holds pending automation clicks and releases them lead_time seconds before
+    the next slot boundary, so WSJT-X starts transmitting in that slot instead
+    of waiting out a whole period. parity restricts releases to boundaries of
+    'even' (00/30 s) or 'odd' (15/45 s) slots; None accepts either.
+    """
+
+    def __init__(self, lead_time=1.0, parity=None, clock=time.time):
+        self.lead_time = min(max(0.0, lead_time), SLOT_SECONDS)
+        self.parity = parity
+        self.clock = clock
+        self.pending = {}
+
+    def next_boundary(self, now):
+        boundary = (now // SLOT_SECONDS + 1) * SLOT_SECONDS
+        if self.parity is not None:
+            is_even = round(boundary / SLOT_SECONDS) % 2 == 0
+            if is_even != (self.parity == 'even'):
+                boundary += SLOT_SECONDS
+        return boundary
+
+    def release_delay(self, now=None):
+        # Seconds until pending clicks are due; 0 once inside the lead window.
+        if now is None:
+            now = self.clock()
+        return max(0.0, self.next_boundary(now) - self.lead_time - now)
+
+    def submit(self, key, action):
+        # Returns False if a click for this key is already waiting.
+        if key in self.pending:
+            return False
+        self.pending[key] = action
+        return True
+
+    def release(self):
+        actions = list(self.pending.values())
+        self.pending.clear()
+        return actions
+
+    def clear(self):
+        self.pending.clear()
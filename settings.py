@@ -1,37 +1,300 @@
+import copy
 import json
 import os
+import stat
+import tempfile
+import threading
+import time
+from collections import deque
 
-class Settings:
-    def __init__(self):
-        self.config_file = 'config.json'
-        self.defaults = {
-            'click_interval': 500,  # ms
-            'visible_bands': ['40m', '20m', '17m', '15m', '12m', '10m'],
-            'cq_time_remaining': 90,
-            'cqs_remaining': 10,
-            'app_time_remaining': 0,  # 0 for unlimited
-            'keyboard_shortcuts': True,
-            'log_export_path': '~/Desktop',
-            'auto_learn': False,
-            'learned_buttons': {}
-        }
-        self.load()
-
-    def load(self):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as f:
-                self.settings = json.load(f)
-        else:
-            self.settings = self.defaults.copy()
-            self.save()
+SCHEMA_VERSION = 1
+DEFAULTS = {
+    'click_interval': 1.0,
+    'visible_bands': ['40m', '20m', '17m', '15m', '12m', '10m'],
+    'cq_time': 200,
+    'cqs_remaining': 3,
+    'app_time': 60*60,
+    'learned_buttons': {},
+    'window_geometry': {'x': 100, 'y': 100, 'width': 1200, 'height': 800},
+    'log_expanded': True,
+    'current_band': '40m',
+    'window_maximized': False,
+}
 
-    def save(self):
-        with open(self.config_file, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+def migrate_learned_buttons(data):
+    # v0 -> v1: the TX button was saved as 'tx_enable', and each button kept
+    # a single OFF 'color' before ON/OFF states were learned per shade.
+    learned = data.get('learned_buttons')
+    if not isinstance(learned, dict):
+        return
+    if 'tx_enable' in learned and 'enable_tx' not in learned:
+        learned['enable_tx'] = learned.pop('tx_enable')
+    for button_data in learned.values():
+        if 'color' in button_data:
+            button_data['states'] = {str(tuple(button_data.pop('color'))): 'inactive'}
+
+# MIGRATIONS[n] upgrades a schema version n file to version n + 1, in place.
+MIGRATIONS = [migrate_learned_buttons]
+
+def migrate(data):
+    version = int(data.get('schema_version', 0))
+    while version < SCHEMA_VERSION:
+        MIGRATIONS[version](data)
+        version += 1
+    data['schema_version'] = max(version, SCHEMA_VERSION)
+    return data
+
+def write_text_atomic(path, text):
+    # A crash mid-write leaves the previous file intact instead of a truncated one.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            # mkstemp creates the file 0600; keep the permissions the settings file had.
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def encode_entry(key, value):
+    # One top-level member exactly as json.dump(..., indent=4) lays it out.
+    return f"    {json.dumps(key)}: " + json.dumps(value, indent=4).replace("\n", "\n    ")
+
+
+class SettingsWriter:
+    """
+    Write-behind persistence for a JSON settings file. save() hands over
+    snapshots of the changed top-level keys only; a background thread waits
+    `interval` seconds so bursts of saves collapse into one write, re-encodes
+    just those keys next to the cached text of the others and replaces the
+    file atomically. flush() writes whatever is pending right away. A file
+    someone else changed since it was last read or written is not replaced;
+    the changes wait until the store has applied that file's contents.
+    """
+
+    def __init__(self, path, interval=2.0, on_error=None):
+        self.path = path
+        self.interval = interval
+        self.on_error = on_error
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.changes = {}
+        self.keys = []
+        self.pending = False
+        self.pending_since = 0.0
+        self.closing = False
+        # Encoded member text per key and the key order last written; only touched under write_lock.
+        self.encoded = {}
+        self.written_keys = None
+        # What the file last held as far as this process knows (read or written),
+        # and the texts written recently, so a file watcher can tell our own
+        # writes from someone else's. Both are only touched under write_lock.
+        self.last_text = None
+        self.written_texts = deque(maxlen=8)
+        self.thread = threading.Thread(target=self.run, name="settings-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, changes, keys):
+        """
+        `changes` maps changed keys to values the caller will not mutate
+        afterwards; `keys` lists every key the file should hold, in order.
+        """
+        with self.condition:
+            self.changes.update(changes)
+            self.keys = list(keys)
+            closing = self.closing
+            if not closing:
+                if not self.pending:
+                    self.pending_since = time.monotonic()
+                self.pending = True
+                self.condition.notify()
+        if closing:
+            self.write(force=True)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closing:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                while not self.closing:
+                    remaining = self.pending_since + self.interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            self.write()
+
+    def write(self, force=False):
+        with self.write_lock:
+            with self.condition:
+                # Take everything saved so far; a write that finds nothing new
+                # lost the race to flush(), which already wrote it.
+                changes, self.changes = self.changes, {}
+                keys = self.keys
+                self.pending = False
+                force = force or self.closing
+            if not changes and keys == self.written_keys:
+                return
+            try:
+                if not force and self.changed_on_disk():
+                    # Keep the changes, newer saves winning, and retry after the interval.
+                    with self.condition:
+                        self.changes = {**changes, **self.changes}
+                        if not self.pending:
+                            self.pending = True
+                            self.pending_since = time.monotonic()
+                    return
+                for key, value in changes.items():
+                    self.encoded[key] = encode_entry(key, value)
+                members = [self.encoded[key] for key in keys if key in self.encoded]
+                text = "{\n" + ",\n".join(members) + "\n}" if members else "{}"
+                self.last_text = text
+                self.written_texts.append(text)
+                write_text_atomic(self.path, text)
+                self.written_keys = keys
+            except Exception as e:
+                if callable(self.on_error):
+                    self.on_error(f"Could not save settings: {e}")
+
+    def changed_on_disk(self):
+        # Caller holds write_lock.
+        try:
+            with open(self.path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return False
+        return text != self.last_text and text not in self.written_texts
+
+    def flush(self):
+        self.write()
+
+    def close(self):
+        self.write(force=True)
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join(timeout=5)
 
-    def get(self, key):
-        return self.settings.get(key, self.defaults.get(key))
 
-    def set(self, key, value):
-        self.settings[key] = value
-        self.save()
\ No newline at end of file
+class SettingsStore:
+    """
+    The settings file as a mapping. The file is read and migrated to
+    SCHEMA_VERSION on first access; missing keys fall back to DEFAULTS, and
+    values of scalar defaults are coerced to the default's type. Assigning a
+    key marks it dirty, and save() passes only dirty keys to the writer.
+    Values are often mutated in place, so callers re-assign a key after
+    changing it.
+    """
+
+    def __init__(self, path, defaults=DEFAULTS, interval=2.0, on_error=None):
+        self.path = path
+        self.defaults = defaults
+        self._data = None
+        self.dirty = set()
+        self.writer = SettingsWriter(path, interval=interval, on_error=on_error)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.read()
+            # The writer holds no encoded text yet, so the first save writes everything.
+            self.dirty = set(self._data)
+        return self._data
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return migrate(copy.deepcopy(self.defaults))
+        with open(self.path, 'r') as f:
+            text = f.read()
+        with self.writer.write_lock:
+            self.writer.last_text = text
+        return migrate(json.loads(text))
+
+    def read_external(self):
+        """
+        Parses the file when someone else changed it and diffs it against the
+        text this store last read or wrote. Returns (text, changed values,
+        removed keys), or None when the file holds that text or another one
+        the writer produced. Safe to call off the GUI thread; raises OSError
+        or ValueError for a missing or malformed file.
+        """
+        with open(self.path, 'r') as f:
+            text = f.read()
+        with self.writer.write_lock:
+            known = self.writer.last_text
+            if text == known or text in self.writer.written_texts:
+                return None
+        new = migrate(json.loads(text))
+        old = migrate(json.loads(known)) if known else {}
+        changes = {key: value for key, value in new.items() if key not in old or old[key] != value}
+        return text, changes, set(old) - set(new)
+
+    def apply(self, external):
+        """
+        Takes over what read_external() found and returns the changed keys.
+        They are marked dirty so the writer's cached text follows the file.
+        """
+        text, changes, removed = external
+        for key, value in changes.items():
+            self[key] = value
+        for key in removed:
+            if key in self.data:
+                del self[key]
+        with self.writer.write_lock:
+            self.writer.last_text = text
+        return set(changes) | set(removed)
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            if default is not None or key not in self.defaults:
+                return default
+            return copy.deepcopy(self.defaults[key])
+        value = self.data[key]
+        expected = self.defaults.get(key)
+        if type(expected) in (bool, int, float) and type(value) is not type(expected):
+            try:
+                return type(expected)(value)
+            except (TypeError, ValueError):
+                return expected if default is None else default
+        return value
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.dirty.add(key)
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.dirty.discard(key)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def save(self):
+        # Only dirty values are copied, so the GUI thread never snapshots the whole file.
+        data = self.data
+        changes = {key: copy.deepcopy(data[key]) for key in self.dirty if key in data}
+        self.dirty.clear()
+        self.writer.save(changes, list(data))
+
+    def close(self):
+        # A push the watcher has not applied yet still wins over our last values.
+        try:
+            external = self.read_external()
+        except (OSError, ValueError):
+            external = None
+        if external is not None:
+            self.apply(external)
+            self.save()
+        self.writer.close()
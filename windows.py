@@ -0,0 +1,219 @@
+import re
+import sys
+import threading
+import time
+
+DEFAULT_TITLE = "WSJT-X"
+
+def normalize_title(title):
+    # "WSJT-X   v2.7.0" and the process name "wsjtx" both reduce to "wsjtx...".
+    return re.sub(r"[^0-9a-z]", "", (title or "").lower())
+
+
+class WindowLocator:
+    """
+    Finds the FT8 program's top-level window and reports its geometry as
+    (left, top, width, height). Enumerating every window is the expensive
+    part, so it only happens when no window is cached (at most every
+    FIND_RETRY seconds); each tick after that is one query for the cached window.
+    Secondary windows (WSJT-X's Wide Graph, say) share the title, so a window
+    is only picked by a point inside it or by its last known size.
+    """
+
+    name = "window list"
+    FIND_RETRY = 5.0
+
+    def __init__(self, title=DEFAULT_TITLE):
+        self.title = normalize_title(title)
+        self.lock = threading.Lock()
+        self.handle = None
+        self.size = None
+        self.next_find = 0.0
+
+    def matches(self, *names):
+        return any(self.title in normalize_title(name) for name in names if name)
+
+    def windows(self):
+        # [(handle, (left, top, width, height)), ...] of matching windows, front to back.
+        raise NotImplementedError
+
+    def geometry(self, handle):
+        # Geometry of one window, or None once it is gone or hidden.
+        raise NotImplementedError
+
+    def attach(self, point=None, size=None):
+        """
+        Pick the matching window containing `point`, or else the one closest
+        to `size` (width, height), and cache it. Returns its geometry or None.
+        """
+        with self.lock:
+            return self._attach(point, size)
+
+    def _attach(self, point=None, size=None):
+        best = None
+        best_distance = None
+        for handle, (left, top, width, height) in self.windows():
+            if point is not None:
+                x, y = point
+                if left <= x < left + width and top <= y < top + height:
+                    best = (handle, (left, top, width, height))
+                    break
+            elif size is not None:
+                distance = abs(width - size[0]) + abs(height - size[1])
+                if best is None or distance < best_distance:
+                    best, best_distance = (handle, (left, top, width, height)), distance
+        self.next_find = time.monotonic() + self.FIND_RETRY
+        if best is None:
+            return None
+        self.handle = best[0]
+        self.size = best[1][2:]
+        return best[1]
+
+    def locate(self):
+        with self.lock:
+            if self.handle is not None:
+                geometry = self.geometry(self.handle)
+                if geometry is not None:
+                    self.size = geometry[2:]
+                    return geometry
+                self.handle = None
+            if self.size is None or time.monotonic() < self.next_find:
+                return None
+            # The window was closed or hidden; take back the one shaped like it.
+            return self._attach(size=self.size)
+
+
+class QuartzWindowLocator(WindowLocator):
+    name = "macOS window list"
+
+    @staticmethod
+    def bounds(info):
+        bounds = info.get("kCGWindowBounds")
+        if not bounds:
+            return None
+        return int(bounds["X"]), int(bounds["Y"]), int(bounds["Width"]), int(bounds["Height"])
+
+    def windows(self):
+        from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+
+        found = []
+        for info in CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or []:
+            if info.get("kCGWindowLayer", 0) != 0:
+                continue
+            if self.matches(info.get("kCGWindowOwnerName"), info.get("kCGWindowName")):
+                bounds = self.bounds(info)
+                if bounds is not None:
+                    found.append((info.get("kCGWindowNumber"), bounds))
+        return found
+
+    def geometry(self, handle):
+        from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionIncludingWindow
+
+        info_list = CGWindowListCopyWindowInfo(kCGWindowListOptionIncludingWindow, handle) or []
+        if not info_list or not info_list[0].get("kCGWindowIsOnscreen", True):
+            return None
+        return self.bounds(info_list[0])
+
+
+class X11WindowLocator(WindowLocator):
+    """EWMH window list (_NET_CLIENT_LIST) through python-xlib."""
+
+    name = "X11 client list"
+
+    def __init__(self, title=DEFAULT_TITLE):
+        super().__init__(title)
+        from Xlib import display
+
+        self.display = display.Display()
+        self.root = self.display.screen().root
+        self.client_list = self.display.intern_atom("_NET_CLIENT_LIST")
+        self.wm_name = self.display.intern_atom("_NET_WM_NAME")
+        self.utf8 = self.display.intern_atom("UTF8_STRING")
+
+    def window_geometry(self, window):
+        geometry = window.get_geometry()
+        origin = self.root.translate_coords(window, 0, 0)
+        return origin.x, origin.y, geometry.width, geometry.height
+
+    def windows(self):
+        from Xlib import X
+
+        prop = self.root.get_full_property(self.client_list, X.AnyPropertyType)
+        found = []
+        for window_id in (prop.value if prop is not None else []):
+            window = self.display.create_resource_object("window", window_id)
+            try:
+                name = window.get_full_property(self.wm_name, self.utf8)
+                title = name.value.decode("utf-8", "replace") if name is not None else window.get_wm_name()
+                wm_class = window.get_wm_class() or ()
+                if self.matches(title, *wm_class):
+                    found.append((window_id, self.window_geometry(window)))
+            except Exception:
+                # Windows can disappear between listing and querying them.
+                continue
+        return found
+
+    def geometry(self, handle):
+        from Xlib import X
+
+        window = self.display.create_resource_object("window", handle)
+        try:
+            if window.get_attributes().map_state != X.IsViewable:
+                return None
+            return self.window_geometry(window)
+        except Exception:
+            return None
+
+
+class Win32WindowLocator(WindowLocator):
+    name = "Win32 window list"
+
+    def __init__(self, title=DEFAULT_TITLE):
+        super().__init__(title)
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.rect = wintypes.RECT
+        self.enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+
+    def windows(self):
+        user32 = self.user32
+        found = []
+
+        def visit(hwnd, _lparam):
+            if user32.IsWindowVisible(hwnd):
+                length = user32.GetWindowTextLengthW(hwnd)
+                buffer = self.ctypes.create_unicode_buffer(length + 1)
+                user32.GetWindowTextW(hwnd, buffer, length + 1)
+                if self.matches(buffer.value):
+                    geometry = self.geometry(hwnd)
+                    if geometry is not None:
+                        found.append((hwnd, geometry))
+            return True
+
+        user32.EnumWindows(self.enum_proc(visit), 0)
+        return found
+
+    def geometry(self, handle):
+        user32 = self.user32
+        if not user32.IsWindow(handle) or not user32.IsWindowVisible(handle) or user32.IsIconic(handle):
+            return None
+        rect = self.rect()
+        if not user32.GetWindowRect(handle, self.ctypes.byref(rect)):
+            return None
+        return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+
+
+def window_locator(title=DEFAULT_TITLE):
+    """The platform's window locator, or None where window geometry is unavailable."""
+    try:
+        if sys.platform == "darwin":
+            return QuartzWindowLocator(title)
+        if sys.platform == "win32":
+            return Win32WindowLocator(title)
+        return X11WindowLocator(title)
+    except Exception:
+        # No python-xlib, no X display (Wayland, headless) and the like.
+        return None